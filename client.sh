@@ -0,0 +1 @@
+python3 -S src/client.py "$@"
@@ -0,0 +1,117 @@
+import errno
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from fsio import temp_path
+from manifest import file_entry
+
+logger = logging.getLogger("assets")
+
+FICLONE = 0x40049409
+MODES = ("auto", "copy", "hardlink", "reflink")
+
+# flipped off after the first failure so every file doesn't retry a dead path
+reflink_supported = os.name == "posix"
+reflink_warned = False
+
+
+def reflink(source, dest):
+    import fcntl
+
+    with open(source, "rb") as src, open(dest, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(source, dest)
+
+
+def hardlink(source, dest):
+    os.link(source, dest)
+
+
+def copy(source, dest):
+    # copyfile uses os.sendfile on Linux
+    shutil.copy2(source, dest)
+
+
+def reflink_fallback(reason):
+    # an explicit --static-mode reflink still works without reflinks, but says so
+    global reflink_warned
+    if not reflink_warned:
+        reflink_warned = True
+        logger.warning("reflinks are not available (%s), copying instead", reason)
+
+
+def place_file(source, dest, mode="auto"):
+    global reflink_supported
+    tmp_path = temp_path(dest)
+    try:
+        if mode == "hardlink":
+            os.remove(tmp_path)
+            try:
+                hardlink(source, tmp_path)
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                    raise
+                copy(source, tmp_path)
+        elif mode in ("auto", "reflink") and reflink_supported:
+            try:
+                reflink(source, tmp_path)
+            except (OSError, ImportError) as e:
+                reflink_supported = False
+                if mode == "reflink":
+                    reflink_fallback(f"{type(e).__name__}: {e}")
+                copy(source, tmp_path)
+        else:
+            if mode == "reflink":
+                reflink_fallback("an earlier reflink failed" if os.name == "posix" else os.name)
+            copy(source, tmp_path)
+    except BaseException:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, dest)
+
+
+def needs_copy(source, dest, entry, previous=None, checksum=False):
+    try:
+        st = os.stat(dest)
+    except FileNotFoundError:
+        return True
+    if st.st_size != entry["size"]:
+        return True
+    if checksum:
+        return not previous or previous["hash"] != entry["hash"]
+    # copies keep the source mtime and hard links share the inode
+    return st.st_mtime_ns != entry["mtime"]
+
+
+def sync_file(source, dest, previous=None, mode="auto", checksum=False):
+    entry = file_entry(source, previous)
+    entry["output"] = dest
+    copied = needs_copy(source, dest, entry, previous, checksum)
+    if copied:
+        place_file(source, dest, mode)
+    return source, entry, copied
+
+
+def sync_static(files, previous, mode="auto", workers=8, checksum=False):
+    # directories must already exist; returns manifest entries and the copy count
+    if mode not in MODES:
+        raise ValueError(f"unknown static mode {mode}")
+    entries = {}
+    copied = 0
+
+    def run(job):
+        source, dest = job
+        return sync_file(source, dest, previous.get(source), mode, checksum)
+
+    if workers <= 1 or len(files) < 2:
+        results = list(map(run, files))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, files))
+    for source, entry, was_copied in results:
+        entries[source] = entry
+        copied += was_copied
+    return entries, copied
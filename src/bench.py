@@ -0,0 +1,198 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from corpus import DEFAULT_MIX, generate_markdown, generate_site, parse_mix
+from main import build
+from textnode import (
+    TextNode,
+    TextType,
+    block_to_block_type,
+    extract_markdown_links,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    split_nodes_image,
+    split_nodes_link,
+    text_node_to_html_node,
+    text_to_textnodes,
+)
+
+
+def best_of(fn, repeat, setup=None):
+    # setup() runs untimed before each repeat and its result is passed to fn
+    best = None
+    for _ in range(repeat):
+        args = (setup(),) if setup is not None else ()
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def stage(seconds, size):
+    return {"seconds": seconds, "mb_per_second": size / seconds / 1e6 if seconds else None}
+
+
+def bench_pipeline(markdown, repeat=5):
+    size = len(markdown)
+    blocks = markdown_to_blocks(markdown)
+
+    stages = {
+        "markdown_to_blocks": stage(best_of(lambda: markdown_to_blocks(markdown), repeat), size),
+        "block_to_block_type": stage(
+            best_of(lambda: [block_to_block_type(b) for b in blocks], repeat), size
+        ),
+        "text_to_textnodes": stage(
+            best_of(lambda: [text_to_textnodes(b) for b in blocks], repeat), size
+        ),
+        "markdown_to_html_node": stage(
+            best_of(lambda: markdown_to_html_node(markdown), repeat), size
+        ),
+        # a fresh tree every time: a parent keeps its HTML once serialized
+        "to_html": stage(
+            best_of(
+                lambda node: node.to_html(), repeat, lambda: markdown_to_html_node(markdown)
+            ),
+            size,
+        ),
+    }
+
+    tracemalloc.start()
+    tree = markdown_to_html_node(markdown)
+    tree_bytes, _ = tracemalloc.get_traced_memory()
+    del tree
+    tracemalloc.stop()
+    return stages, {"input_bytes": size, "blocks": len(blocks), "tree_bytes": tree_bytes}
+
+
+def span_stage(seconds, spans):
+    return {"seconds": seconds, "ns_per_span": seconds / spans * 1e9 if spans else None}
+
+
+def bench_spans(markdown, repeat=5):
+    # per inline span costs of the tokenizer, the node renderer and the legacy
+    # split/extract helpers
+    blocks = [b for b in markdown_to_blocks(markdown) if block_to_block_type(b) == "paragraph"]
+    nodes = [node for b in blocks for node in text_to_textnodes(b)]
+    text_nodes = [TextNode(b, TextType.TEXT) for b in blocks]
+    spans = len(nodes)
+    return {
+        "span_tokenize": span_stage(
+            best_of(lambda: [text_to_textnodes(b) for b in blocks], repeat), spans
+        ),
+        "span_render": span_stage(
+            best_of(lambda: [text_node_to_html_node(n) for n in nodes], repeat), spans
+        ),
+        "span_split_legacy": span_stage(
+            best_of(lambda: split_nodes_link(split_nodes_image(text_nodes)), repeat), spans
+        ),
+        "span_extract_links": span_stage(
+            best_of(lambda: [extract_markdown_links(b) for b in blocks], repeat), spans
+        ),
+    }
+
+
+def bench_build(pages, blocks, repeat=3, jobs=1, mix=None):
+    with tempfile.TemporaryDirectory() as root:
+        generate_site(root, pages=pages, blocks=blocks, mix=mix)
+        kwargs = {
+            "content_dir": os.path.join(root, "content"),
+            "static_dir": os.path.join(root, "static"),
+            "template_path": os.path.join(root, "template.html"),
+            "public_dir": os.path.join(root, "public"),
+            "manifest_path": os.path.join(root, "manifest.json"),
+            "jobs": jobs,
+        }
+        with contextlib.redirect_stdout(io.StringIO()):
+            # the block cache outlives a build in this process, so with it on
+            # every repeat after the first would be all hits
+            full = best_of(lambda: build(incremental=False, cache_size=0, **kwargs), repeat)
+            noop = best_of(lambda: build(incremental=True, **kwargs), repeat)
+    return {
+        "build_full": {"seconds": full, "pages_per_second": pages / full},
+        "build_incremental_noop": {"seconds": noop, "pages_per_second": pages / noop},
+    }
+
+
+def compare(result, baseline, threshold):
+    regressions = []
+    for name, current in result["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous:
+            continue
+        ratio = current["seconds"] / previous["seconds"]
+        print(f"{name:24} {previous['seconds']:.4f}s -> {current['seconds']:.4f}s ({ratio:.2f}x)")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the markdown pipeline")
+    parser.add_argument("--blocks", type=int, default=20000, help="blocks in the document")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="block weights, e.g. paragraph=4,quote=1 (kinds: %s)" % ",".join(DEFAULT_MIX),
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=200, help="pages in the build benchmark")
+    parser.add_argument("--page-blocks", type=int, default=50)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--no-build", action="store_true", help="skip the full build benchmark")
+    parser.add_argument("-o", "--output", help="write the JSON result to this file")
+    parser.add_argument("--baseline", help="earlier JSON result to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="fail when a stage is this many times slower than the baseline",
+    )
+    args = parser.parse_args(argv)
+
+    markdown = generate_markdown(args.blocks, args.seed, args.mix)
+    stages, document = bench_pipeline(markdown, args.repeat)
+    stages.update(bench_spans(markdown, args.repeat))
+    if not args.no_build:
+        stages.update(bench_build(args.pages, args.page_blocks, jobs=args.jobs, mix=args.mix))
+    result = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {
+            "blocks": args.blocks,
+            "seed": args.seed,
+            "mix": args.mix,
+            "pages": args.pages,
+            "page_blocks": args.page_blocks,
+            "jobs": args.jobs,
+        },
+        "document": document,
+        "stages": stages,
+    }
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            raise SystemExit(f"regressed stages: {', '.join(regressions)}")
+
+if __name__ == "__main__":
+    main()
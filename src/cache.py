@@ -0,0 +1,79 @@
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+
+# bump whenever block rendering changes so stale on-disk entries are ignored
+CACHE_VERSION = 2
+TABLE = f"blocks_v{CACHE_VERSION}"
+
+
+class BlockCache:
+    def __init__(self, maxsize=4096, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE} "
+                "(key TEXT PRIMARY KEY, html TEXT NOT NULL, meta TEXT)"
+            )
+
+    def __repr__(self):
+        return f"BlockCache({len(self.entries)}/{self.maxsize}, hits={self.hits}, misses={self.misses})"
+
+    def __len__(self):
+        return len(self.entries)
+
+    def key(self, block):
+        return hashlib.sha1(f"{CACHE_VERSION}\0{block}".encode()).hexdigest()
+
+    def get(self, block):
+        # values are (html, index data) pairs
+        value = self.entries.get(block)
+        if value is not None:
+            self.entries.move_to_end(block)
+            self.hits += 1
+            return value
+        if self.db is not None:
+            row = self.db.execute(
+                f"SELECT html, meta FROM {TABLE} WHERE key = ?", (self.key(block),)
+            ).fetchone()
+            if row:
+                self.hits += 1
+                value = (row[0], json.loads(row[1]) if row[1] else None)
+                self.remember(block, value)
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, block, value):
+        self.remember(block, value)
+        if self.db is not None:
+            html, meta = value
+            self.db.execute(
+                f"INSERT OR REPLACE INTO {TABLE} (key, html, meta) VALUES (?, ?, ?)",
+                (self.key(block), html, json.dumps(meta) if meta is not None else None),
+            )
+
+    def remember(self, block, value):
+        if self.maxsize <= 0:
+            return
+        self.entries[block] = value
+        self.entries.move_to_end(block)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
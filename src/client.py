@@ -0,0 +1,58 @@
+import json
+import os
+import socket
+import sys
+
+# Sends a build request to `main.py daemon`. Deliberately imports nothing of
+# the builder, so a request costs interpreter startup plus one round trip.
+# Without a daemon it falls back to a normal incremental (or --full) build.
+
+SOCKET_PATH = ".build-daemon.sock"
+USAGE = "usage: client.py [--socket PATH] [--full | --stop] [PATH ...]"
+
+
+def request(path, payload):
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+def parse_args(argv):
+    path = SOCKET_PATH
+    payload = {"full": False, "paths": []}
+    argv = list(argv)
+    while argv:
+        arg = argv.pop(0)
+        if arg == "--socket" and argv:
+            path = argv.pop(0)
+        elif arg == "--full":
+            payload["full"] = True
+        elif arg == "--stop":
+            payload = {"command": "stop"}
+        elif arg.startswith("-"):
+            raise SystemExit(USAGE)
+        elif "paths" in payload:
+            payload["paths"].append(os.path.abspath(arg))
+    return path, payload
+
+
+def main(argv=None):
+    path, payload = parse_args(sys.argv[1:] if argv is None else argv)
+    try:
+        response = request(path, payload)
+    except (FileNotFoundError, ConnectionRefusedError):
+        if payload.get("command") == "stop":
+            raise SystemExit(f"no daemon listening on {path}")
+        main_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        args = [sys.executable, main_py] + ([] if payload["full"] else ["--incremental"])
+        os.execv(sys.executable, args)
+    sys.stdout.write(response["output"])
+    for source, error in response["errors"].items():
+        print(f"{source}: {error}", file=sys.stderr)
+    return 0 if response["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
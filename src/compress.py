@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from fsio import imap, temp_path
+
+COMPRESSIBLE = (".html", ".css", ".js", ".json", ".xml", ".svg", ".txt")
+# smaller files don't shrink enough to be worth a second request path
+MIN_SIZE = 256
+FORMATS = ("gz", "br") if brotli is not None else ("gz",)
+
+# whitespace is significant inside these, so they are left alone
+PRESERVE = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.DOTALL | re.IGNORECASE)
+# runs that minify_text might change; single spaces between words are skipped
+WHITESPACE = re.compile(r"\s{2,}|[^\S ]|(?<=>)\s|\s(?=<)")
+OPEN_PRESERVE = re.compile(r"<(?:pre|textarea|script|style)\b", re.IGNORECASE)
+TAG_NAME = re.compile(r"</?([a-zA-Z][\w-]*)")
+# tags that never render the whitespace around them
+BLOCK_TAGS = frozenset(
+    "html head body title meta link base style script div p ul ol li dl dt dd "
+    "blockquote pre h1 h2 h3 h4 h5 h6 header footer nav main section article "
+    "aside figure figcaption table thead tbody tfoot tr td th hr br form".split()
+)
+
+
+def is_block_tag(html, start, end):
+    m = TAG_NAME.match(html, start, end)
+    return m is not None and m.group(1).lower() in BLOCK_TAGS
+
+
+def minify_text(html):
+    def collapse(m):
+        start, end = m.span()
+        if 0 < start and end < len(html) and html[start - 1] == ">" and html[end] == "<":
+            if is_block_tag(html, html.rfind("<", 0, start), start) or is_block_tag(
+                html, end, len(html)
+            ):
+                return ""
+        elif start == 0 or end == len(html):
+            # the start or end of the page
+            return ""
+        return "\n" if "\n" in m.group() else " "
+
+    return WHITESPACE.sub(collapse, html)
+
+
+def minify_html(html, after=""):
+    # whitespace runs collapse to one character and disappear next to block
+    # level tags; <pre>, <textarea>, <script> and <style> keep theirs. after
+    # is the tag that follows html when it is only the first part of a page
+    parts = PRESERVE.split(html + after)
+    # split() returns text, match, tag name, text, ...
+    ret = []
+    for i in range(0, len(parts), 3):
+        # a preserved element counts as its tag for the text on either side,
+        # so an inline one like <textarea> keeps the spaces around it
+        before = f"</{parts[i - 1]}>" if i else ""
+        following = f"<{parts[i + 2]}>" if i + 2 < len(parts) else ""
+        text = minify_text(before + parts[i] + following)
+        ret.append(text[len(before) : len(text) - len(following)])
+        if i + 1 < len(parts):
+            ret.append(parts[i + 1])
+    html = "".join(ret)
+    return html[: len(html) - len(after)]
+
+
+class MinifyWriter:
+    # minifies a page that is written out in pieces; text is held back until
+    # it can be cut before a complete tag outside any preserved element
+    CHUNK = 1 << 16
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.pending = []
+        self.size = 0
+
+    def write(self, text):
+        self.pending.append(text)
+        self.size += len(text)
+        if self.size >= self.CHUNK:
+            self.cut()
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def cut(self):
+        html = "".join(self.pending)
+        self.pending = [html]
+        cut = html.rfind("<")
+        if cut > 0 and html.find(">", cut) < 0:
+            cut = html.rfind("<", 0, cut)
+        m = TAG_NAME.match(html, cut) if cut > 0 else None
+        if m is None or OPEN_PRESERVE.search(PRESERVE.split(html[:cut])[-1]):
+            # wait for the rest of the tag or the preserved element
+            self.size = 0
+            return
+        self.fp.write(minify_html(html[:cut], after=f"<{m.group()[1:]}>"))
+        self.pending = [html[cut:]]
+        self.size = len(html) - cut
+
+    def finish(self):
+        self.fp.write(minify_html("".join(self.pending)))
+        self.pending = []
+
+
+def compress_bytes(data, fmt):
+    if fmt == "gz":
+        return gzip.compress(data, 9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+def write_sibling(path, data, st):
+    tmp_path = temp_path(path)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def up_to_date(previous, digest):
+    return (
+        previous is not None
+        and previous["hash"] == digest
+        and previous["formats"] == list(FORMATS)
+        and all(os.path.exists(sibling) for sibling in previous["siblings"])
+    )
+
+
+def compress_output(path, digest=None, previous=None):
+    # writes path.gz (and path.br) next to path unless the content hash and the
+    # formats match what was compressed last time; digest, when known, saves
+    # reading the file just to hash it
+    if digest is not None and up_to_date(previous, digest):
+        return previous, False
+    with open(path, "rb") as f:
+        data = f.read()
+    st = os.stat(path)
+    digest = hashlib.sha256(data).hexdigest()
+    if up_to_date(previous, digest):
+        return previous, False
+    siblings = []
+    if len(data) >= MIN_SIZE:
+        for fmt in FORMATS:
+            packed = compress_bytes(data, fmt)
+            if len(packed) < len(data):
+                sibling = f"{path}.{fmt}"
+                write_sibling(sibling, packed, st)
+                siblings.append(sibling)
+    return {"hash": digest, "formats": list(FORMATS), "siblings": siblings}, True
+
+
+def precompress(jobs, workers=4):
+    # jobs are (entry, digest, previous); entry["compressed"] is filled in and
+    # the number of files actually compressed is returned
+    def run(job):
+        entry, digest, previous = job
+        return compress_output(entry["output"], digest, previous)
+
+    compressed = 0
+    for (entry, _, _), (result, changed) in zip(jobs, imap(run, jobs, workers)):
+        entry["compressed"] = result
+        compressed += changed
+    return compressed
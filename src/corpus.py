@@ -0,0 +1,130 @@
+import os
+import random
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog middle earth ring bearer "
+    "shire hobbit wizard elf dwarf mountain river forest road journey"
+).split()
+
+DEFAULT_MIX = {
+    "heading": 1,
+    "paragraph": 4,
+    "unordered_list": 1,
+    "ordered_list": 1,
+    "quote": 1,
+    "code": 1,
+}
+
+TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <title> {{ Title }} </title>
+    <link href="/index.css" rel="stylesheet">
+</head>
+<body>
+    <article>
+        {{ Content }}
+    </article>
+</body>
+</html>
+"""
+
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"unknown block kind {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def inline_text(rng, words=24, emphasis=0.25):
+    ret = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        # emphasis=0 asks for plain text
+        roll = rng.random() / emphasis if emphasis > 0 else 1
+        if roll < 0.28:
+            word = f"**{word}**"
+        elif roll < 0.52:
+            word = f"*{word}*"
+        elif roll < 0.6:
+            word = f"**{word} *{rng.choice(WORDS)}* {rng.choice(WORDS)}**"
+        elif roll < 0.76:
+            word = f"`{word}`"
+        elif roll < 0.92:
+            word = f"[{word}](/{rng.choice(WORDS)}/{word})"
+        elif roll < 1:
+            word = f"![{word}](/images/{word}.png)"
+        ret.append(word)
+    return " ".join(ret)
+
+
+def block(rng, kind, emphasis=0.25):
+    if kind == "heading":
+        return f"{'#' * rng.randint(2, 6)} {sentence(rng, 5)}"
+    if kind == "paragraph":
+        return inline_text(rng, rng.randint(10, 60), emphasis)
+    if kind == "unordered_list":
+        return "\n".join(
+            f"* {inline_text(rng, 8, emphasis)}" for _ in range(rng.randint(2, 8))
+        )
+    if kind == "ordered_list":
+        # block_to_block_type only recognises single digit ordered lists
+        return "\n".join(
+            f"{n}. {inline_text(rng, 8, emphasis)}" for n in range(1, rng.randint(3, 9))
+        )
+    if kind == "quote":
+        return "\n".join(
+            f"> {inline_text(rng, 10, emphasis)}" for _ in range(rng.randint(1, 4))
+        )
+    if kind == "code":
+        lines = [f"    {sentence(rng, 6)}" for _ in range(rng.randint(2, 10))]
+        return "```\n" + "\n".join(lines) + "\n```"
+    raise ValueError(f"unknown block kind {kind}")
+
+
+def generate_markdown(blocks=1000, seed=0, mix=None, emphasis=0.25):
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    ret = [f"# {sentence(rng, 4)}"]
+    for kind in rng.choices(kinds, weights, k=blocks):
+        ret.append(block(rng, kind, emphasis))
+    return "\n\n".join(ret)
+
+
+def generate_site(root, pages=100, blocks=50, depth=2, fanout=10, seed=0, mix=None):
+    # pages are spread over a tree of directories `depth` levels deep
+    content = os.path.join(root, "content")
+    static = os.path.join(root, "static")
+    os.makedirs(content, exist_ok=True)
+    os.makedirs(os.path.join(static, "images"), exist_ok=True)
+    with open(os.path.join(root, "template.html"), "w") as f:
+        f.write(TEMPLATE)
+    with open(os.path.join(static, "index.css"), "w") as f:
+        f.write("body { margin: 0 auto; max-width: 40em; }\n")
+    with open(os.path.join(static, "images", "logo.png"), "wb") as f:
+        f.write(random.Random(seed).randbytes(4096))
+
+    paths = []
+    for i in range(pages):
+        parts = []
+        n = i
+        for _ in range(depth):
+            parts.append(f"d{n % fanout}")
+            n //= fanout
+        directory = os.path.join(content, *parts)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"page{i}.md")
+        with open(path, "w") as f:
+            f.write(generate_markdown(blocks, seed + i, mix))
+        paths.append(path)
+    return paths
@@ -0,0 +1,143 @@
+import contextlib
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+
+logger = logging.getLogger("daemon")
+
+SOCKET_PATH = ".build-daemon.sock"
+
+
+class BuildDaemon:
+    # keeps what a cold build would redo every time: the last manifest, the
+    # source tree listing, and (in this process) the compiled template and the
+    # block cache
+    def __init__(self, build, scan, options, roots=()):
+        self.build = build
+        self.scan = scan
+        self.options = options
+        self.roots = [os.path.abspath(root) + os.sep for root in roots]
+        self.manifest = None
+        self.tree = None
+        self.known = set()
+
+    def rescan(self):
+        self.tree = self.scan()
+        self.known = {
+            os.path.abspath(source) for _, files in self.tree for source, _ in files
+        }
+
+    def tree_for(self, paths):
+        # the listing only has to be redone when a path was added or removed
+        for path in paths:
+            path = os.path.abspath(path)
+            if not path.startswith(tuple(self.roots)):
+                continue
+            if (path in self.known) != os.path.isfile(path):
+                self.tree = None
+                break
+        if self.tree is None:
+            self.rescan()
+        return self.tree
+
+    def expand(self, paths):
+        # a directory (or one that held sources and is gone) stands for every
+        # source under it; it may have gained or lost files, so it is listed
+        # again first
+        files = []
+        dirs = []
+        for path in paths:
+            path = os.path.abspath(path)
+            prefix = path.rstrip(os.sep) + os.sep
+            if os.path.isdir(path) or any(source.startswith(prefix) for source in self.known):
+                dirs.append(prefix)
+            else:
+                files.append(path)
+        if dirs:
+            self.rescan()
+            files += sorted(source for source in self.known if source.startswith(tuple(dirs)))
+        return files
+
+    def run(self, request):
+        full = request.get("full", False)
+        paths = request.get("paths") or []
+        if full or not paths:
+            self.tree = None
+        kwargs = dict(self.options)
+        if paths and not full:
+            paths = self.expand(paths)
+            kwargs["changed"] = paths
+        output = io.StringIO()
+        response = {"ok": True, "errors": {}}
+        try:
+            with contextlib.redirect_stdout(output):
+                self.manifest = self.build(
+                    incremental=not full,
+                    previous=self.manifest,
+                    tree=self.tree_for(paths),
+                    **kwargs,
+                )
+        except Exception as e:
+            # the manifest on disk is still right, it's reloaded next time
+            self.manifest = None
+            self.tree = None
+            response["ok"] = False
+            response["errors"] = getattr(e, "errors", {"build": f"{type(e).__name__}: {e}"})
+        response["output"] = output.getvalue()
+        return response
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError as e:
+            response = {"ok": False, "errors": {"request": str(e)}, "output": ""}
+        else:
+            if request.get("command") == "stop":
+                response = {"ok": True, "errors": {}, "output": "Stopping\n"}
+                threading.Thread(target=self.server.shutdown).start()
+            else:
+                logger.info("Build request: %s", request)
+                response = self.server.builder.run(request)
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    # one request at a time, so builds never overlap
+    def __init__(self, path, builder):
+        self.builder = builder
+        super().__init__(path, DaemonRequestHandler)
+
+
+def remove_stale_socket(path):
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            os.remove(path)
+            return
+    raise SystemExit(f"a daemon is already listening on {path}")
+
+
+def make_daemon(path, build, scan, options, roots=()):
+    remove_stale_socket(path)
+    return DaemonServer(path, BuildDaemon(build, scan, options, roots))
+
+
+def run_daemon(path, build, scan, options, roots=()):
+    server = make_daemon(path, build, scan, options, roots)
+    print(f"Build daemon listening on {path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(path)
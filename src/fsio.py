@@ -0,0 +1,112 @@
+import itertools
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Helpers for filesystems where every call is a round trip (NFS and friends):
+# independent calls are issued from a thread pool instead of one after another.
+
+# mkstemp creates files only the owner can read; temp_path gives them the mode
+# open() would have
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def imap(fn, items, workers=1):
+    items = list(items)
+    if workers <= 1 or len(items) < 2:
+        return list(map(fn, items))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, items))
+
+
+def list_dir(path):
+    # scandir already knows which entries are directories, isdir() would stat each one
+    with os.scandir(path) as it:
+        return sorted((entry.name, entry.is_dir()) for entry in it)
+
+
+def scan_tree(source, destination, workers=1):
+    # breadth first, so every directory is listed after its parent; all the
+    # directories of one level are listed at once
+    dirs = []
+    files = []
+    if not os.path.exists(source):
+        return dirs, files
+    level = [(source, destination)]
+    while level:
+        listings = imap(list_dir, [source_dir for source_dir, _ in level], workers)
+        next_level = []
+        for (source_dir, dest_dir), entries in zip(level, listings):
+            for name, is_dir in entries:
+                source_file = os.path.join(source_dir, name)
+                dest_file = os.path.join(dest_dir, name)
+                if is_dir:
+                    dirs.append(dest_file)
+                    next_level.append((source_file, dest_file))
+                else:
+                    files.append((source_file, dest_file))
+        level = next_level
+    return dirs, files
+
+
+def make_dir(path):
+    try:
+        os.mkdir(path)
+    except FileExistsError:
+        pass
+    except FileNotFoundError:
+        os.makedirs(path, exist_ok=True)
+
+
+def temp_path(dest):
+    # a fresh hidden name next to dest. Nothing in the output tree can own it,
+    # and parallel workers never share one
+    fd, path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(dest)}.", suffix=".tmp", dir=os.path.dirname(dest)
+    )
+    os.close(fd)
+    os.chmod(path, 0o666 & ~UMASK)
+    return path
+
+
+def make_dirs(dirs, workers=1):
+    # one mkdir per directory, shallowest first so parents always exist, and
+    # every directory of the same depth in one batch
+    by_depth = {}
+    for path in dict.fromkeys(os.path.normpath(path) for path in dirs):
+        by_depth.setdefault(path.count(os.sep), []).append(path)
+    for depth in sorted(by_depth):
+        imap(make_dir, by_depth[depth], workers)
+
+
+def pipeline(items, read, process, write, workers=4, depth=16):
+    # read() runs up to `depth` items ahead of process() and write() trails it
+    # by as many, so I/O overlaps with the CPU work process() does on this
+    # thread while memory stays bounded. process(item, load) gets load() for
+    # the prefetched data and returns (result, payload); a payload that is not
+    # None is handed to write(result, payload). Results come back in order.
+    items = iter(items)
+    reads = deque()
+    writes = deque()
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+
+        def fill():
+            for item in itertools.islice(items, depth - len(reads)):
+                reads.append((item, pool.submit(read, item)))
+
+        fill()
+        while reads:
+            item, future = reads.popleft()
+            fill()
+            result, payload = process(item, future.result)
+            if payload is not None:
+                while len(writes) >= depth:
+                    writes.popleft().result()
+                writes.append(pool.submit(write, result, payload))
+            results.append(result)
+        for future in writes:
+            future.result()
+    return results
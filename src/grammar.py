@@ -0,0 +1,69 @@
+import re
+from enum import Enum
+
+from htmlnode import LeafNode
+
+# Everything the markdown parser matches or dispatches on, compiled once at
+# import time.
+
+
+class TextType(Enum):
+    TEXT = "text"
+    BOLD = "bold"
+    ITALIC = "italic"
+    CODE = "code"
+    LINK = "link"
+    IMAGE = "image"
+
+    # members are singletons, so identity hashing is enough and keeps the
+    # RENDERERS lookup in C instead of Enum.__hash__
+    __hash__ = object.__hash__
+
+
+# Looking up TextType.TEXT goes through the enum metaclass every time; the
+# parser's hot paths use these module globals and `is` instead.
+TEXT = TextType.TEXT
+BOLD = TextType.BOLD
+ITALIC = TextType.ITALIC
+CODE = TextType.CODE
+LINK = TextType.LINK
+IMAGE = TextType.IMAGE
+
+
+# every inline construct in one alternation, tried left to right at each
+# position. An unclosed delimiter runs to the end. Images and links need
+# whitespace (or the start of the text) before them; only their opener is
+# matched here, because a regex looking for the closer again from every
+# unclosed `[` is quadratic. The tokenizer resolves the rest with cached
+# str.find positions.
+INLINE = re.compile(
+    r"(?<!\S)(?P<bracket>!?\[)"
+    r"|\*\*(?P<bold>.*?)(?:\*\*|\Z)"
+    r"|\*(?P<italic>.*?)(?:\*|\Z)"
+    r"|`(?P<code>.*?)(?:`|\Z)",
+    re.DOTALL,
+)
+# Match.lastgroup of a delimiter match -> what it produced
+INLINE_TYPES = {
+    "bold": BOLD,
+    "italic": ITALIC,
+    "code": CODE,
+}
+
+# the older split/extract helpers
+IMAGE_REF = re.compile(r"\s!\[.*?\]\(.*?\)")
+LINK_REF = re.compile(r"\s\[.*?\]\(.*?\)")
+IMAGE_SPLIT = re.compile(r"(?:^|\s)!\[[^\]]*?\]\([^\)]*?\)")
+LINK_SPLIT = re.compile(r"(?:^|\s)\[.*?\]\(.*?\)")
+
+
+RENDERERS = {
+    TEXT: lambda node: LeafNode(None, node.text),
+    BOLD: lambda node: LeafNode("b", node.text),
+    ITALIC: lambda node: LeafNode("i", node.text),
+    CODE: lambda node: LeafNode("code", node.text),
+    LINK: lambda node: LeafNode("a", node.text, props={"href": node.url}),
+    IMAGE: lambda node: LeafNode(
+        "img", "", props={"src": node.url, "alt": node.text}
+    ),
+}
@@ -1,16 +1,65 @@
+import weakref
+from operator import attrgetter
+
+
+def invalidating(slot):
+    # a field whose setter drops the cached HTML of the node and its ancestors
+    def setter(self, value):
+        setattr(self, slot, value)
+        self.invalidate()
+
+    return property(attrgetter(slot), setter)
+
+
 class HTMLNode:
+    # parents keep their serialized HTML in `html` until something below them
+    # changes. Nodes point back at their parent through a weak reference, so
+    # trees are still freed as soon as the last reference to them goes. This
+    # only pays off for callers that keep a tree and edit it: builds stream
+    # pages with write_html() and watch/daemon rebuild their trees, relying on
+    # the block cache instead.
+    __slots__ = ("_tag", "_value", "_children", "_props", "_parent", "html", "__weakref__")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
-        self.value = value
-        self.children = children
-        self.props = props
+        self._tag = tag
+        self._value = value
+        self._children = children
+        self._props = props
+        self._parent = None
+        self.html = None
 
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
 
+    tag = invalidating("_tag")
+    value = invalidating("_value")
+    props = invalidating("_props")
+
+    @property
+    def children(self):
+        return self._children
+
+    @property
+    def parent(self):
+        return self._parent() if self._parent is not None else None
+
+    def invalidate(self):
+        # call after changing children or props in place; siblings keep
+        # their cached HTML
+        node = self
+        while node is not None:
+            node.html = None
+            node = node.parent
+
     def to_html(self):
         raise NotImplementedError()
 
+    def iter_html(self):
+        raise NotImplementedError()
+
+    def write_html(self, fp):
+        fp.writelines(self.iter_html())
+
     def props_to_html(self):
         return (
             " ".join(f'{key}="{val}"' for key, val in self.props.items())
@@ -20,27 +69,103 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, value=None, props=None):
-        super().__init__(tag=tag, value=value, children=None, props=props)
+        self._tag = tag
+        self._value = value
+        self._children = None
+        self._props = props
+        self._parent = None
+        self.html = None
 
     def to_html(self):
         # if not self.value:
 
         #     raise Exception(f"must have a value {str(self)}")
-        if not self.tag:
-            return str(self.value)
-        props_render = f" {self.props_to_html()}" if self.props else ""
-        return f"<{self.tag}{props_render}>{self.value}</{self.tag}>"
+        if not self._tag:
+            return str(self._value)
+        props_render = f" {self.props_to_html()}" if self._props else ""
+        return f"<{self._tag}{props_render}>{self._value}</{self._tag}>"
+
+    def iter_html(self):
+        yield self.to_html()
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
-        super().__init__(tag=tag, value=None, children=children, props=props)
+        self._tag = tag
+        self._value = None
+        self._props = props
+        self._parent = None
+        self.html = None
+        self._children = children
+        self.adopt(children)
+
+    @HTMLNode.children.setter
+    def children(self, children):
+        self._children = children
+        self.adopt(children)
+        self.invalidate()
+
+    def adopt(self, children):
+        if children:
+            ref = weakref.ref(self)
+            for child in children:
+                child._parent = ref
+
+    def replace_child(self, i, node):
+        # swaps one subtree; the next to_html() reuses every other child's HTML
+        old = self._children[i]
+        if old.parent is self:
+            old._parent = None
+        self._children[i] = node
+        self.adopt([node])
+        self.invalidate()
 
     def to_html(self):
-        if not self.tag:
+        if self.html is None:
+            if not self._tag:
+                raise ValueError("must have a tag")
+            if not self._children:
+                raise ValueError("must have children")
+            parts = [f"<{self._tag}>"]
+            parts.extend([child.to_html() for child in self._children])
+            parts.append(f"</{self._tag}>")
+            self.html = "".join(parts)
+        return self.html
+
+    def iter_html(self):
+        # streams piece by piece and leaves the cache alone
+        if not self._tag:
             raise ValueError("must have a tag")
-        if not self.children:
+        if not self._children:
             raise ValueError("must have children")
 
-        return f"<{self.tag}>{''.join(x.to_html() for x in self.children)}</{self.tag}>"
+        yield f"<{self._tag}>"
+        for child in self._children:
+            yield from child.iter_html()
+        yield f"</{self._tag}>"
+
+
+class LazyParentNode(ParentNode):
+    __slots__ = ()
+
+    # children is a callable returning a fresh iterable of nodes, so a page can
+    # be streamed without ever holding all of its blocks. Nothing is cached.
+    def adopt(self, children):
+        pass
+
+    def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        if not self._tag:
+            raise ValueError("must have a tag")
+
+        yield f"<{self._tag}>"
+        for child in self._children():
+            yield from child.iter_html()
+        yield f"</{self._tag}>"
@@ -0,0 +1,193 @@
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from server import SiteFiles, make_server
+
+SERVERS = ("builtin", "http.server", "none")
+
+
+def site_paths(directory):
+    paths = []
+    for dir_path, _, file_names in os.walk(directory):
+        for name in sorted(file_names):
+            if name.endswith((".gz", ".br", ".tmp")):
+                continue
+            rel = os.path.relpath(os.path.join(dir_path, name), directory)
+            paths.append("/" + rel.replace(os.sep, "/"))
+    return sorted(paths)
+
+
+def quiet(*args):
+    pass
+
+
+def run_server(kind, directory, manifest_path, sock):
+    # child process, so the server doesn't share a GIL with the load generator
+    if kind == "builtin":
+        server = make_server(directory, port=0, site=SiteFiles(manifest_path))
+    else:
+        # what `python3 -m http.server` runs, minus the access log
+        handler = type("Handler", (SimpleHTTPRequestHandler,), {"log_message": quiet})
+        server = ThreadingHTTPServer(("localhost", 0), partial(handler, directory=directory))
+    server.socket.close()
+    server.socket = sock
+    server.serve_forever()
+
+
+def start_server(kind, directory, manifest_path):
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("localhost", 0))
+    sock.listen(128)
+    process = multiprocessing.get_context("fork").Process(
+        target=run_server, args=(kind, directory, manifest_path, sock), daemon=True
+    )
+    process.start()
+    port = sock.getsockname()[1]
+    sock.close()
+    return process, f"http://localhost:{port}"
+
+
+def worker(url, paths, count, headers, revalidate, results):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+    etags = {}
+    latencies = []
+    statuses = {}
+    size = 0
+    errors = 0
+    for i in range(count):
+        path = paths[i % len(paths)]
+        request_headers = dict(headers)
+        if revalidate and path in etags:
+            request_headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=request_headers)
+            response = conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            continue
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        size += len(body)
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+    conn.close()
+    results.append((latencies, statuses, size, errors))
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+def load(url, paths, requests, concurrency, headers=None, revalidate=False):
+    results = []
+    per_worker = max(1, requests // concurrency)
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(url, paths[i:] + paths[:i], per_worker, headers or {}, revalidate, results),
+        )
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    latencies = sorted(x for result in results for x in result[0])
+    statuses = {}
+    for result in results:
+        for status, n in result[1].items():
+            statuses[str(status)] = statuses.get(str(status), 0) + n
+    return {
+        "requests": len(latencies),
+        "errors": sum(result[3] for result in results),
+        "seconds": seconds,
+        "requests_per_second": len(latencies) / seconds if seconds else None,
+        "bytes": sum(result[2] for result in results),
+        "statuses": statuses,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.5),
+            "p90": percentile(latencies, 0.9),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1] * 1000 if latencies else None,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test a server for public/ on localhost")
+    parser.add_argument("--dir", default="public", help="directory the paths are taken from")
+    parser.add_argument("--manifest", default=".build-manifest.json")
+    parser.add_argument(
+        "--server",
+        choices=SERVERS,
+        default="builtin",
+        help="server to start (none: test --url as it is)",
+    )
+    parser.add_argument("--url", help="base URL when --server none")
+    parser.add_argument("-n", "--requests", type=int, default=5000)
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--gzip", action="store_true", help="send Accept-Encoding: br, gzip")
+    parser.add_argument(
+        "--revalidate", action="store_true", help="repeat requests with If-None-Match"
+    )
+    parser.add_argument("-o", "--output", help="write the JSON result to this file")
+    args = parser.parse_args(argv)
+
+    paths = site_paths(args.dir)
+    if not paths:
+        raise SystemExit(f"nothing to request in {args.dir}")
+    process = None
+    if args.server == "none":
+        if not args.url:
+            parser.error("--server none needs --url")
+        url = args.url
+    else:
+        process, url = start_server(args.server, args.dir, args.manifest)
+    try:
+        headers = {"Accept-Encoding": "br, gzip"} if args.gzip else {}
+        load(url, paths[:1], min(100, args.requests), 1, headers)  # warm up
+        result = load(url, paths, args.requests, args.concurrency, headers, args.revalidate)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+    result["config"] = {
+        "server": args.server,
+        "url": url,
+        "paths": len(paths),
+        "concurrency": args.concurrency,
+        "gzip": args.gzip,
+        "revalidate": args.revalidate,
+    }
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0 if not result["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
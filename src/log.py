@@ -0,0 +1,65 @@
+import logging
+import logging.handlers
+import sys
+
+FORMAT = "%(levelname)s %(name)s: %(message)s"
+
+_handler = None
+# (verbose, levels) from the last configure(), handed to pool workers
+config = None
+
+
+def parse_levels(items):
+    # "textnode=DEBUG,main=INFO" (or several such arguments) -> {name: level}
+    levels = {}
+    for item in items or ():
+        for pair in item.split(","):
+            name, sep, level = pair.partition("=")
+            if not sep or not name:
+                raise ValueError(f"expected MODULE=LEVEL, got {pair!r}")
+            levels[name.strip()] = logging.getLevelName(level.strip().upper())
+            if not isinstance(levels[name.strip()], int):
+                raise ValueError(f"unknown log level {level!r}")
+    return levels
+
+
+def configure(verbose=0, levels=None, stream=None, buffered=True):
+    # quiet by default; records are buffered and written in batches, and only
+    # errors force an immediate flush. Long running commands (serve, daemon)
+    # pass buffered=False so each record is written as it happens.
+    global _handler, config
+    config = (verbose, levels)
+    root = logging.getLogger()
+    if _handler is not None:
+        _handler.flush()
+        root.removeHandler(_handler)
+    target = logging.StreamHandler(stream or sys.stderr)
+    target.setFormatter(logging.Formatter(FORMAT))
+    _handler = target
+    if buffered:
+        _handler = logging.handlers.MemoryHandler(
+            capacity=1024, flushLevel=logging.ERROR, target=target
+        )
+    root.addHandler(_handler)
+    root.setLevel(
+        logging.WARNING if verbose <= 0 else logging.INFO if verbose == 1 else logging.DEBUG
+    )
+    for name, level in (levels or {}).items():
+        logging.getLogger(name).setLevel(level)
+
+
+def flush():
+    if _handler is not None:
+        _handler.flush()
+
+
+def init_worker():
+    # pool workers leave through os._exit, skipping logging's own shutdown
+    # flush, so theirs runs as a multiprocessing finalizer. A forked worker
+    # also starts with a copy of the parent's buffer, which the parent writes.
+    from multiprocessing import util
+
+    if isinstance(_handler, logging.handlers.MemoryHandler):
+        with _handler.lock:
+            _handler.buffer.clear()
+    util.Finalize(None, flush, exitpriority=0)
@@ -1,62 +1,893 @@
+import time
+
+# --timings reports everything before main() runs as the import phase
+STARTED = time.perf_counter()
+
+import argparse
+import logging
+import mmap
 import os
 import shutil
-from textnode import TextNode, extract_header, markdown_to_html_node, text_node_to_html_node
+from contextlib import contextmanager
 
+import log
+import profiling
+from assets import MODES, sync_static
+from fsio import imap, make_dirs, pipeline, scan_tree, temp_path
+from manifest import (
+    empty_manifest,
+    file_entry,
+    is_stale,
+    load_manifest,
+    outputs,
+    save_manifest,
+)
+from shard import SHARD_MANIFEST, MergeError, parse_shard, shard_dir
 
-def  generate_page(from_path, template_path, dest_path):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    from_file = ""
-    with open(from_path) as f:
-        from_file = f.read()
-    template_file = ""
-    with open(template_path) as f:
-        template_file = f.read()
+# Everything that only some commands need (the markdown parser, the HTTP
+# server, compression, sqlite, multiprocessing) is imported where it is used,
+# so `--help` or an incremental build with nothing to render starts fast.
 
-    
-    # print(markdown_to_html_node(from_file))
-    # print("above is markdown --------------")
-    template_file = template_file.replace("{{ Content }}", markdown_to_html_node(from_file).to_html())
-    template_file = template_file.replace("{{ Title }}", extract_header(from_file))
-    with open(dest_path, "w") as f:
-        f.write(template_file)
+CONTENT_DIR = "content"
+STATIC_DIR = "static"
+TEMPLATE_PATH = "template.html"
+PUBLIC_DIR = "public"
+MANIFEST_PATH = ".build-manifest.json"
+STREAM_THRESHOLD = 1 << 20
 
+logger = logging.getLogger("main")
+block_cache = None
+minify_pages = False
 
-def generate_page_recur(dir_path_content, template_path, dest_dir_path):
-    if not os.path.exists(dir_path_content):
-        return
-    for file in os.listdir(dir_path_content):
-        source_file = os.path.join(dir_path_content, file)
-        dest_file = os.path.join(dest_dir_path, file)
-        if os.path.isdir(source_file):
-            os.mkdir(dest_file)
-            generate_page_recur(source_file, template_path, dest_file)
+
+class BuildError(Exception):
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} pages failed to render")
+        self.errors = errors
+
+
+@contextmanager
+def map_file(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield buf
+
+
+def iter_mapped_nodes(path, index):
+    from textnode import iter_block_nodes
+
+    with map_file(path) as buf:
+        yield from iter_block_nodes(buf, block_cache, index)
+
+
+def  generate_page(from_path, template_path, dest_path, from_file=None, output=None):
+    # from_file is the already read source; output(dest_path, html) takes the
+    # rendered page instead of it being written here
+    from htmlnode import LazyParentNode
+    from template import load_template
+    from textnode import SOURCE_ENCODING, PageIndex, extract_header, markdown_to_html_node
+
+    logger.info("Generating page from %s to %s using %s", from_path, dest_path, template_path)
+    start = time.perf_counter()
+    template = load_template(template_path)
+
+    index = PageIndex()
+    streamed = from_file is None and os.path.getsize(from_path) > STREAM_THRESHOLD
+    if streamed:
+        # big sources are mapped and parsed block by block while the page is
+        # written out, so neither the file nor the page is ever held whole
+        with map_file(from_path) as buf:
+            title = extract_header(buf)
+        content = LazyParentNode("div", lambda: iter_mapped_nodes(from_path, index))
+        read_done = parse_done = time.perf_counter()
+        output = None
+    else:
+        if from_file is None:
+            with open(from_path, encoding=SOURCE_ENCODING) as f:
+                from_file = f.read()
+        read_done = time.perf_counter()
+        content = markdown_to_html_node(from_file, block_cache, index)
+        if index.title is None:
+            raise ValueError("need a header")
+        title = index.title
+        parse_done = time.perf_counter()
+
+    values = {"Content": content, "Title": title}
+    # time spent turning nodes into HTML, as opposed to the file I/O; for a
+    # streamed page it includes parsing, which happens as the page is written
+    serialize = 0.0
+    if output is None and (streamed or not minify_pages):
+
+        def write(f):
+            nonlocal serialize
+            if profiling.current is not None:
+                f = timed = profiling.TimedWriter(f)
+            if minify_pages:
+                # only streamed pages get here with --minify
+                from compress import MinifyWriter
+
+                f = MinifyWriter(f)
+            begin = time.perf_counter()
+            template.write(f, values)
+            if minify_pages:
+                f.finish()
+            if profiling.current is not None:
+                serialize = time.perf_counter() - begin - timed.seconds
+
+        write_page(dest_path, write)
+    else:
+        html = template.render(values)
+        if minify_pages:
+            from compress import minify_html
+
+            html = minify_html(html)
+        serialize = time.perf_counter() - parse_done
+        if output is not None:
+            output(dest_path, html)
+            output_bytes = len(html)
+        else:
+            write_page(dest_path, lambda f: f.write(html))
+
+    if profiling.current is not None:
+        profiling.add("read", read_done - start)
+        profiling.add("parse", parse_done - read_done)
+        profiling.add("serialize", serialize)
+        profiling.add("write", time.perf_counter() - parse_done - serialize)
+        profiling.count(
+            "output_bytes",
+            output_bytes if output is not None else os.path.getsize(dest_path),
+        )
+    return index
+
+
+def write_page(dest_path, write):
+    from textnode import SOURCE_ENCODING
+
+    # the rename keeps a failed render from leaving a truncated page behind
+    tmp_path = temp_path(dest_path)
+    try:
+        with open(tmp_path, "w", encoding=SOURCE_ENCODING) as f:
+            write(f)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, dest_path)
+
+
+def collect_files(source, destination, workers=1):
+    return scan_tree(source, destination, workers)
+
+
+def scan_sources(static_dir, content_dir, public_dir, workers=1):
+    return (
+        collect_files(static_dir, public_dir, workers),
+        collect_files(content_dir, public_dir, workers),
+    )
+
+
+def init_worker(options):
+    # keeps a matching cache alive so watch rebuilds reuse warm entries
+    global block_cache, minify_pages
+    minify_pages = options.get("minify", False)
+    cache_size = options.get("cache_size", 0)
+    cache_path = options.get("cache_path")
+    if block_cache is not None and (block_cache.maxsize, block_cache.path) != (
+        cache_size,
+        cache_path,
+    ):
+        block_cache.close()
+        block_cache = None
+    if block_cache is None and (cache_size > 0 or cache_path):
+        from cache import BlockCache
+
+        block_cache = BlockCache(cache_size, cache_path)
+    if options.get("log") and options["log"] != log.config:
+        log.configure(*options["log"])
+    if options.get("profile"):
+        profiling.enable(options.get("cprofile_page"), options.get("cprofile_path"))
+
+
+def init_pool_worker(options):
+    log.init_worker()
+    init_worker(options)
+
+
+def render_job(job, from_file=None, output=None):
+    source_file, template_path, dest_file = job
+    before = block_cache.stats() if block_cache is not None else {}
+    page = profiling.begin(source_file) if profiling.enabled else None
+    error = index = None
+    start = time.perf_counter()
+    try:
+        if page is not None and os.path.normpath(source_file) == profiling.cprofile_page:
+            index = profiling.profile_call(
+                generate_page, source_file, template_path, dest_file, from_file, output
+            )
+        else:
+            index = generate_page(source_file, template_path, dest_file, from_file, output)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    if page is not None:
+        page["seconds"] = time.perf_counter() - start
+        profiling.end()
+    after = block_cache.stats() if block_cache is not None else {}
+    stats = {key: after[key] - before[key] for key in after}
+    return {
+        "source": source_file,
+        "error": error,
+        "cache": stats,
+        "profile": page,
+        "index": index.to_dict() if index is not None else None,
+    }
+
+
+def prefetch_source(job):
+    from textnode import SOURCE_ENCODING
+
+    source_file = job[0]
+    try:
+        if os.path.getsize(source_file) <= STREAM_THRESHOLD:
+            with open(source_file, encoding=SOURCE_ENCODING) as f:
+                return f.read()
+    except (OSError, ValueError):
+        pass  # generate_page reads it again and reports the error
+    return None
+
+
+def write_output(result, payload):
+    dest_path, html = payload
+    try:
+        write_page(dest_path, lambda f: f.write(html))
+    except OSError as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["index"] = None
+
+
+def render_prefetched(job, load):
+    outputs = []
+    result = render_job(job, load(), lambda *payload: outputs.append(payload))
+    return result, outputs[0] if outputs else None
+
+
+def render_pages(jobs, jobs_count=1, options=None, io_workers=0, io_depth=16):
+    if not jobs:
+        return {}, {}, [], {}
+    options = options or {}
+    if jobs_count == 1 or len(jobs) < 2:
+        init_worker(options)
+        if io_workers > 0:
+            # sources are read ahead and pages written behind on I/O threads
+            results = pipeline(
+                jobs, prefetch_source, render_prefetched, write_output, io_workers, io_depth
+            )
+        else:
+            results = list(map(render_job, jobs))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunksize = max(1, len(jobs) // (jobs_count * 4))
+        with ProcessPoolExecutor(
+            max_workers=jobs_count,
+            initializer=init_pool_worker,
+            initargs=(options,),
+        ) as pool:
+            results = list(pool.map(render_job, jobs, chunksize=chunksize))
+
+    errors = {}
+    totals = {}
+    pages = []
+    indexes = {}
+    for result in results:
+        if result["error"]:
+            errors[result["source"]] = result["error"]
         else:
-            if ".md" in file:
-                dest_file = dest_file.replace(".md", ".html")
-                generate_page(source_file, template_path, dest_file)
+            indexes[result["source"]] = result["index"]
+        for key, value in result["cache"].items():
+            totals[key] = totals.get(key, 0) + value
+        if result["profile"] is not None:
+            pages.append(result["profile"])
+    return errors, totals, pages, indexes
+
+
+def page_jobs(files):
+    return [
+        (source_file, dest_file.replace(".md", ".html"))
+        for source_file, dest_file in files
+        if ".md" in os.path.basename(source_file)
+    ]
+
+
+def generate_page_recur(dir_path_content, template_path, dest_dir_path):
+    dirs, files = collect_files(dir_path_content, dest_dir_path)
+    for dest_dir in dirs:
+        os.makedirs(dest_dir, exist_ok=True)
+    for source_file, dest_file in page_jobs(files):
+        generate_page(source_file, template_path, dest_file)
 
 
 def recur_copy(source, destination):
-    if not os.path.exists(source):
-        return
-    for file in os.listdir(source):
-        source_file = os.path.join(source, file)
-        dest_file = os.path.join(destination, file)
-        if os.path.isdir(source_file):
-            os.mkdir(dest_file)
-            recur_copy(source_file, dest_file)
+    dirs, files = collect_files(source, destination)
+    for dest_dir in dirs:
+        os.makedirs(dest_dir, exist_ok=True)
+    for source_file, dest_file in files:
+        shutil.copy(source_file, dest_file)
+
+
+def remove_output(path, root):
+    if os.path.exists(path):
+        os.remove(path)
+    parent = os.path.dirname(path)
+    while parent and os.path.abspath(parent) != os.path.abspath(root):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            break
+        parent = os.path.dirname(parent)
+
+
+def remove_orphans(root, keep):
+    # walks with an explicit stack; os.walk recurses once per directory level
+    keep = {os.path.normpath(path) for path in keep}
+    removed = 0
+    dirs = []
+    stack = [root]
+    while stack:
+        dir_path = stack.pop()
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+                    stack.append(entry.path)
+                elif os.path.normpath(entry.path) not in keep:
+                    os.remove(entry.path)
+                    removed += 1
+    # children were found after their parents, so this goes deepest first
+    for dir_path in reversed(dirs):
+        try:
+            os.rmdir(dir_path)
+        except OSError:
+            pass
+    return removed
+
+
+def compress_jobs(old, manifest, rendered):
+    # a static output is a copy of its source, so the source hash is its
+    # content hash; a page that wasn't rendered is still what was compressed
+    # last time. Only re-rendered pages have to be read and hashed.
+    from compress import COMPRESSIBLE
+
+    jobs = []
+    for section in ("pages", "static"):
+        for source, entry in manifest[section].items():
+            if not entry["output"].endswith(COMPRESSIBLE):
+                continue
+            previous = old[section].get(source, {}).get("compressed")
+            if section == "static":
+                digest = entry["hash"]
+            elif source not in rendered and previous is not None:
+                digest = previous["hash"]
+            else:
+                digest = None
+            jobs.append((entry, digest, previous))
+    return jobs
+
+
+def build(
+    content_dir=CONTENT_DIR,
+    static_dir=STATIC_DIR,
+    template_path=TEMPLATE_PATH,
+    public_dir=PUBLIC_DIR,
+    manifest_path=MANIFEST_PATH,
+    incremental=False,
+    jobs=1,
+    static_mode="auto",
+    static_checksum=False,
+    copy_workers=8,
+    cache_size=4096,
+    cache_path=None,
+    profile_path=None,
+    profile_top=10,
+    cprofile_page=None,
+    cprofile_path="page.prof",
+    site_index=False,
+    site_url="",
+    link_report=None,
+    io_workers=0,
+    io_depth=16,
+    minify=False,
+    compress=False,
+    compress_workers=4,
+    previous=None,
+    tree=None,
+    changed=None,
+    shard=None,
+    timings=None,
+):
+    # a full build re-renders every page but still reuses unchanged static
+    # assets, and sweeps anything in public/ it did not produce. A long running
+    # caller can hand in the last build's manifest and the collect_files()
+    # results for static_dir and content_dir, and with `changed` (the only
+    # source paths that may differ from `previous`) nothing else is re-checked.
+    # With shard=(i, N) only the pages and static files planned for shard i
+    # are built, and the site index is left to merge_build(). A `timings` dict
+    # gets the seconds spent walking the tree, rendering and writing.
+    phases = profiling.Phases()
+    old = previous if previous is not None else load_manifest(manifest_path)
+    os.makedirs(public_dir, exist_ok=True)
+    template_path = os.path.abspath(template_path)
+
+    manifest = empty_manifest()
+    manifest["template"] = file_entry(template_path, old["template"])
+    manifest["minify"] = minify
+    # anything that changes every page's output forces a full re-render
+    template_changed = (
+        old["template"] is None
+        or old["template"]["hash"] != manifest["template"]["hash"]
+        or old.get("minify", False) != minify
+    )
+
+    workers = max(io_workers, 1)
+    if tree is None:
+        tree = scan_sources(static_dir, content_dir, public_dir, workers)
+    (static_dirs, static_files), (content_dirs, content_files) = tree
+    make_dirs(static_dirs + content_dirs, workers)
+    sources = page_jobs(content_files)
+    if shard is not None:
+        from shard import plan_shards, shard_info
+
+        index, count = shard
+        candidates = [source for source, _ in static_files + sources]
+        sizes = imap(lambda source: os.stat(source).st_size, candidates, workers)
+        plan = plan_shards(dict(zip(candidates, sizes)), count)
+        static_files = [job for job in static_files if plan[job[0]] == index]
+        sources = [job for job in sources if plan[job[0]] == index]
+        settings = {
+            "template": manifest["template"]["hash"],
+            "minify": minify,
+            "compress": compress,
+        }
+        manifest["shard"] = shard_info(plan, index, count, public_dir, settings)
+
+    unchanged = set()
+    if changed is not None:
+        changed = {os.path.abspath(path) for path in changed}
+        unchanged = {
+            source
+            for source, _ in static_files + sources
+            if os.path.abspath(source) not in changed
+            and (source in old["static"] or source in old["pages"])
+        }
+    phases.mark("walk")
+    manifest["static"], copied = sync_static(
+        [job for job in static_files if job[0] not in unchanged],
+        old["static"],
+        static_mode,
+        copy_workers,
+        static_checksum,
+    )
+    for source_file, _ in static_files:
+        if source_file in unchanged:
+            manifest["static"][source_file] = old["static"][source_file]
+    phases.mark("write")
+
+    pending = []
+    entries = imap(
+        lambda job: dict(old["pages"][job[0]])
+        if job[0] in unchanged
+        else file_entry(job[0], old["pages"].get(job[0])),
+        sources,
+        workers,
+    )
+    for (source_file, dest_file), entry in zip(sources, entries):
+        previous = old["pages"].get(source_file)
+        entry["output"] = dest_file
+        manifest["pages"][source_file] = entry
+        if not incremental or template_changed:
+            pending.append((source_file, template_path, dest_file))
+        elif source_file not in unchanged and is_stale(entry, previous):
+            pending.append((source_file, template_path, dest_file))
+        else:
+            entry["index"] = previous.get("index")
+    phases.mark("walk")
+
+    profile = bool(profile_path or cprofile_page)
+    if profile and (cache_size > 0 or cache_path):
+        # a cached block skips parsing and serialization, and the profile
+        # would neither time nor count it
+        logger.info("Block cache is off while profiling")
+        cache_size, cache_path = 0, None
+    options = {
+        "cache_size": cache_size,
+        "cache_path": cache_path,
+        "profile": profile,
+        "cprofile_page": cprofile_page,
+        "cprofile_path": cprofile_path,
+        "log": log.config,
+        "minify": minify,
+    }
+    try:
+        errors, stats, pages, indexes = render_pages(
+            pending, jobs or os.cpu_count(), options, io_workers, io_depth
+        )
+    finally:
+        profiling.disable()
+    phases.mark("render")
+    for source_file, error in errors.items():
+        logger.error("Error rendering %s: %s", source_file, error)
+        # left out of the manifest so the next incremental build retries it
+        del manifest["pages"][source_file]
+    for source_file, index in indexes.items():
+        manifest["pages"][source_file]["index"] = index
+    rendered = len(pending) - len(errors)
+
+    compressed = None
+    if compress:
+        from compress import precompress
+
+        compressed = precompress(
+            compress_jobs(old, manifest, {job[0] for job in pending}), compress_workers
+        )
+
+    dangling = None
+    if site_index and shard is None:
+        from siteindex import write_site_index
+
+        manifest["generated"], dangling = write_site_index(
+            manifest, public_dir, outputs(manifest), site_url, link_report
+        )
+
+    if incremental:
+        removed = 0
+        for path in sorted(outputs(old) - outputs(manifest)):
+            remove_output(path, public_dir)
+            removed += 1
+    else:
+        removed = remove_orphans(public_dir, outputs(manifest))
+
+    save_manifest(manifest_path, manifest)
+    phases.mark("write")
+    if timings is not None:
+        timings.update(phases.seconds)
+    # one buffered summary instead of a line per page
+    summary = [f"Rendered {rendered} pages, copied {copied} files, removed {removed} outputs"]
+    if compressed is not None:
+        summary.append(f"Compressed {compressed} outputs")
+    if stats:
+        summary.append(f"Block cache: {stats['hits']} hits, {stats['misses']} misses")
+    if dangling is not None:
+        summary.append(
+            f"Site index: {len(manifest['pages'])} pages, {len(dangling)} dangling links"
+            + (f" (see {link_report})" if link_report and dangling else "")
+        )
+    if profile_path:
+        profiling.write_report(profile_path, pages, profile_top)
+        summary.append(f"Wrote build profile to {profile_path}")
+    log.flush()
+    print("\n".join(summary))
+    if errors:
+        raise BuildError(errors)
+    return manifest
+
+
+def merge_build(
+    shard_dirs,
+    public_dir=PUBLIC_DIR,
+    manifest_path=MANIFEST_PATH,
+    static_mode="auto",
+    copy_workers=8,
+    site_index=False,
+    site_url="",
+    link_report=None,
+):
+    # combines the outputs of `--shard i/N` builds into public_dir, as if one
+    # build had made them; raises MergeError if any output is missing or was
+    # produced twice
+    from shard import merge_shards
+    from siteindex import write_site_index
+
+    os.makedirs(public_dir, exist_ok=True)
+    manifest, placed = merge_shards(shard_dirs, public_dir, static_mode, copy_workers)
+    dangling = None
+    if site_index:
+        manifest["generated"], dangling = write_site_index(
+            manifest, public_dir, outputs(manifest), site_url, link_report
+        )
+    removed = remove_orphans(public_dir, outputs(manifest))
+    save_manifest(manifest_path, manifest)
+    summary = [
+        f"Merged {len(shard_dirs)} shards: {len(manifest['pages'])} pages, "
+        f"{len(manifest['static'])} files, placed {placed} outputs, removed {removed} outputs"
+    ]
+    if dangling is not None:
+        summary.append(
+            f"Site index: {len(manifest['pages'])} pages, {len(dangling)} dangling links"
+            + (f" (see {link_report})" if link_report and dangling else "")
+        )
+    print("\n".join(summary))
+    return manifest
+
+
+def build_options(args):
+    # build() keyword arguments shared by every command
+    return {
+        "jobs": args.jobs,
+        "static_mode": args.static_mode,
+        "static_checksum": args.static_checksum,
+        "copy_workers": args.copy_workers,
+        "cache_size": args.block_cache,
+        "cache_path": args.block_cache_db,
+        "profile_path": args.profile,
+        "profile_top": args.profile_top,
+        "cprofile_page": args.cprofile_page,
+        "cprofile_path": args.cprofile_out,
+        "site_index": args.site_index,
+        "site_url": args.site_url,
+        "link_report": args.link_report,
+        "io_workers": args.io_workers,
+        "io_depth": args.io_depth,
+        "minify": args.minify,
+        "compress": args.compress,
+        "compress_workers": args.compress_workers,
+    }
+
+
+def rebuild(args):
+    try:
+        build(incremental=True, **build_options(args))
+    except BuildError:
+        return False
+    return True
+
+
+def serve(args):
+    from server import Reloader, SiteFiles, make_server, start_server
+    from watch import watch
+
+    rebuild(args)
+    reloader = Reloader() if args.watch else None
+    site = SiteFiles(MANIFEST_PATH, args.cache_mb << 20)
+    server = make_server(PUBLIC_DIR, args.host, args.port, reloader, site, args.max_age)
+    thread = start_server(server)
+    host, port = server.server_address[:2]
+    print(f"Serving {PUBLIC_DIR} at http://{host}:{port}/")
+
+    def on_change(paths):
+        logger.info("Changed: %s", ", ".join(paths))
+        if rebuild(args):
+            reloader.notify()
+
+    try:
+        if args.watch:
+            watch([CONTENT_DIR, STATIC_DIR, TEMPLATE_PATH], on_change, args.interval)
         else:
-            shutil.copy(source_file, dest_file)
+            thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if reloader:
+            reloader.close()
+        server.shutdown()
+        server.server_close()
+
+
+def format_timings(timings, total):
+    phases = ", ".join(
+        f"{phase} {timings[phase] * 1000:.1f} ms"
+        for phase in ("import", "walk", "render", "write")
+        if phase in timings
+    )
+    return f"Timings: {phases}, total {total * 1000:.1f} ms"
 
 
-def main():
-    shutil.rmtree("public", ignore_errors=True)
-    os.mkdir("public")
-    recur_copy("static", "public")
-    # generate_page("content/index.md", "template.html", "public/index.html")
-    # print(os.path.abspath("template.html"))
-    generate_page_recur("content", os.path.abspath("template.html"), "public")
-    # print(os.path.abspath("template.html"))
+def main(argv=None):
+    imported = time.perf_counter()
+    parser = argparse.ArgumentParser(description="Build the static site into public/")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild outputs whose inputs changed since the last build",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes used to render pages (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--static-mode",
+        choices=MODES,
+        default="auto",
+        help="how static assets reach public/ (auto tries a reflink, then copies)",
+    )
+    parser.add_argument(
+        "--static-checksum",
+        action="store_true",
+        help="recopy static assets only when their content hash changed, not their mtime",
+    )
+    parser.add_argument(
+        "--copy-workers",
+        type=int,
+        default=8,
+        help="threads used to sync static assets",
+    )
+    parser.add_argument(
+        "--block-cache",
+        type=int,
+        default=4096,
+        help="rendered blocks kept in memory per worker (0 disables the cache)",
+    )
+    parser.add_argument(
+        "--block-cache-db",
+        help="sqlite file that keeps rendered blocks between builds",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="write a JSON report of per-page and per-stage timings",
+    )
+    parser.add_argument(
+        "--profile-top", type=int, default=10, help="slowest pages listed in the report"
+    )
+    parser.add_argument(
+        "--cprofile-page",
+        metavar="SOURCE",
+        help="run cProfile while rendering this source file, e.g. content/index.md",
+    )
+    parser.add_argument(
+        "--cprofile-out", default="page.prof", help="where --cprofile-page writes its stats"
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="log each page (-v) or everything down to the inline tokenizer (-vv)",
+    )
+    parser.add_argument(
+        "--log-level",
+        action="append",
+        metavar="MODULE=LEVEL",
+        help="per-module levels, e.g. textnode=DEBUG,server=WARNING",
+    )
+    parser.add_argument(
+        "--site-index",
+        action="store_true",
+        help="write sitemap.xml, search-index.json and a dangling-link report",
+    )
+    parser.add_argument("--site-url", default="", help="absolute URL prefix for sitemap.xml")
+    parser.add_argument(
+        "--link-report", default="link-report.json", help="where dangling links are listed"
+    )
+    parser.add_argument(
+        "--io-workers",
+        type=int,
+        default=0,
+        help="threads for filesystem calls; reads ahead and writes behind rendering (0 = off)",
+    )
+    parser.add_argument(
+        "--io-depth", type=int, default=16, help="pages buffered ahead of and behind rendering"
+    )
+    parser.add_argument(
+        "--minify", action="store_true", help="collapse insignificant whitespace in pages"
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write .gz (and .br with the brotli module) next to pages and text assets",
+    )
+    parser.add_argument(
+        "--compress-workers", type=int, default=4, help="threads used to compress outputs"
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="print the time spent importing, walking the tree, rendering and writing",
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="I/N",
+        help=f"build only the I-th of N parts of the site into {PUBLIC_DIR}-shard-I-of-N/",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    serve_parser = subparsers.add_parser("serve", help="build, then serve public/ over HTTP")
+    serve_parser.add_argument("--host", default="localhost")
+    serve_parser.add_argument("--port", type=int, default=8888)
+    serve_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="rebuild changed pages in-process and live-reload open browsers",
+    )
+    serve_parser.add_argument(
+        "--interval", type=float, default=0.5, help="seconds between change polls"
+    )
+    serve_parser.add_argument(
+        "--cache-mb", type=int, default=32, help="memory for file bodies kept by the server"
+    )
+    serve_parser.add_argument(
+        "--max-age",
+        type=int,
+        default=0,
+        help="Cache-Control max-age for non-HTML files (0 = always revalidate by ETag)",
+    )
+    daemon_parser = subparsers.add_parser(
+        "daemon", help="stay resident and build on requests sent by src/client.py"
+    )
+    daemon_parser.add_argument(
+        "--socket", help="unix socket to listen on (default .build-daemon.sock)"
+    )
+    merge_parser = subparsers.add_parser(
+        "merge", help=f"combine the outputs of --shard builds into {PUBLIC_DIR}/"
+    )
+    merge_parser.add_argument(
+        "--shards", type=int, help=f"number of shards, read from {PUBLIC_DIR}-shard-I-of-N/"
+    )
+    merge_parser.add_argument(
+        "dirs", nargs="*", metavar="DIR", help="shard output directories, instead of --shards"
+    )
+    args = parser.parse_args(argv)
+    shard = None
+    if args.shard:
+        if args.command:
+            parser.error(f"--shard can't be used with {args.command}")
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    try:
+        levels = log.parse_levels(args.log_level)
+    except ValueError as e:
+        parser.error(str(e))
+    # serve and daemon run until killed, so their logs aren't held back
+    log.configure(args.verbose, levels, buffered=args.command not in ("serve", "daemon"))
+    if args.command == "serve":
+        return serve(args)
+    if args.command == "daemon":
+        from daemon import SOCKET_PATH, run_daemon
+
+        workers = max(args.io_workers, 1)
+        return run_daemon(
+            args.socket or SOCKET_PATH,
+            build,
+            lambda: scan_sources(STATIC_DIR, CONTENT_DIR, PUBLIC_DIR, workers),
+            build_options(args),
+            (STATIC_DIR, CONTENT_DIR),
+        )
+    if args.command == "merge":
+        dirs = args.dirs
+        if not dirs and args.shards:
+            dirs = [shard_dir(PUBLIC_DIR, i, args.shards) for i in range(1, args.shards + 1)]
+        if not dirs:
+            parser.error("merge needs --shards N or the shard directories")
+        try:
+            merge_build(
+                dirs,
+                static_mode=args.static_mode,
+                copy_workers=args.copy_workers,
+                site_index=args.site_index,
+                site_url=args.site_url,
+                link_report=args.link_report,
+            )
+        except MergeError as e:
+            for problem in e.problems:
+                logger.error("%s", problem)
+            raise SystemExit(str(e))
+        return
+    kwargs = build_options(args)
+    if shard is not None:
+        kwargs["public_dir"] = shard_dir(PUBLIC_DIR, *shard)
+        kwargs["manifest_path"] = os.path.join(kwargs["public_dir"], SHARD_MANIFEST)
+    timings = {"import": imported - STARTED} if args.timings else None
+    try:
+        build(incremental=args.incremental, shard=shard, timings=timings, **kwargs)
+    except BuildError as e:
+        raise SystemExit(str(e))
+    finally:
+        if timings is not None:
+            print(format_timings(timings, time.perf_counter() - STARTED))
 
 if __name__ == "__main__":
     main()
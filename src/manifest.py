@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+
+from fsio import temp_path
+
+MANIFEST_VERSION = 2
+
+
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def empty_manifest():
+    return {
+        "version": MANIFEST_VERSION,
+        "template": None,
+        "pages": {},
+        "static": {},
+        "generated": [],
+    }
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return empty_manifest()
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return empty_manifest()
+    return manifest
+
+
+def save_manifest(path, manifest):
+    tmp_path = temp_path(path)
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def file_entry(path, previous=None):
+    # size and mtime match the last build -> trust the recorded hash
+    st = os.stat(path)
+    if (
+        previous
+        and previous.get("size") == st.st_size
+        and previous.get("mtime") == st.st_mtime_ns
+    ):
+        digest = previous["hash"]
+    else:
+        digest = hash_file(path)
+    return {"hash": digest, "size": st.st_size, "mtime": st.st_mtime_ns}
+
+
+def is_stale(entry, previous):
+    if not previous:
+        return True
+    if previous.get("hash") != entry["hash"]:
+        return True
+    if previous.get("output") != entry.get("output"):
+        return True
+    return not os.path.exists(entry["output"])
+
+
+def outputs(manifest):
+    ret = set()
+    for section in ("pages", "static"):
+        for entry in manifest[section].values():
+            ret.add(entry["output"])
+            if entry.get("compressed"):
+                ret.update(entry["compressed"]["siblings"])
+    ret.update(manifest["generated"])
+    return ret
@@ -0,0 +1,145 @@
+import json
+import os
+import time
+
+enabled = False
+current = None
+cprofile_page = None
+cprofile_path = None
+_originals = {}
+
+
+def enable(page=None, path=None):
+    # wraps the hot textnode functions only while profiling, so a normal build
+    # pays nothing for this module
+    global enabled, cprofile_page, cprofile_path
+    cprofile_page = os.path.normpath(page) if page else None
+    cprofile_path = path
+    if enabled:
+        return
+    enabled = True
+    import textnode
+
+    text_to_textnodes = textnode.text_to_textnodes
+    block_to_html_node = textnode.block_to_html_node
+    _originals["text_to_textnodes"] = text_to_textnodes
+    _originals["block_to_html_node"] = block_to_html_node
+
+    def timed_text_to_textnodes(text):
+        if current is None:
+            return text_to_textnodes(text)
+        start = time.perf_counter()
+        nodes = text_to_textnodes(text)
+        add("inline", time.perf_counter() - start)
+        count("text_nodes", len(nodes))
+        return nodes
+
+    def counted_block_to_html_node(block, index=None):
+        if current is not None:
+            count("blocks")
+        return block_to_html_node(block, index)
+
+    textnode.text_to_textnodes = timed_text_to_textnodes
+    textnode.block_to_html_node = counted_block_to_html_node
+
+
+def disable():
+    global enabled, current
+    if _originals:
+        import textnode
+
+        for name, fn in _originals.items():
+            setattr(textnode, name, fn)
+    _originals.clear()
+    enabled = False
+    current = None
+
+
+def begin(source):
+    global current
+    current = {"source": source, "seconds": 0.0, "stages": {}, "counts": {}}
+    return current
+
+
+def end():
+    global current
+    page = current
+    current = None
+    return page
+
+
+def add(stage, seconds):
+    stages = current["stages"]
+    stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+def count(name, n=1):
+    counts = current["counts"]
+    counts[name] = counts.get(name, 0) + n
+
+
+def profile_call(fn, *args):
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args)
+    finally:
+        profiler.dump_stats(cprofile_path)
+
+
+class TimedWriter:
+    # wraps a page's file; time spent in write() is I/O, the rest of writing
+    # the page is serialization
+    def __init__(self, fp):
+        self.fp = fp
+        self.seconds = 0.0
+
+    def write(self, text):
+        start = time.perf_counter()
+        self.fp.write(text)
+        self.seconds += time.perf_counter() - start
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+
+class Phases:
+    # wall time of the build phases for --timings; mark(phase) charges the
+    # time since the previous mark to that phase
+    def __init__(self):
+        self.seconds = {}
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + now - self.last
+        self.last = now
+
+
+def report(pages, top=10):
+    totals = {}
+    counts = {}
+    for page in pages:
+        for stage, seconds in page["stages"].items():
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        for name, n in page["counts"].items():
+            counts[name] = counts.get(name, 0) + n
+    slowest = sorted(pages, key=lambda page: page["seconds"], reverse=True)[:top]
+    return {
+        "pages": len(pages),
+        "seconds": sum(page["seconds"] for page in pages),
+        "stages": totals,
+        "counts": counts,
+        "slowest": [
+            {"source": page["source"], "seconds": page["seconds"]} for page in slowest
+        ],
+        "per_page": sorted(pages, key=lambda page: page["source"]),
+    }
+
+
+def write_report(path, pages, top=10):
+    with open(path, "w") as f:
+        json.dump(report(pages, top), f, indent=2)
+        f.write("\n")
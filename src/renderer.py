@@ -0,0 +1,80 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import log
+from cache import BlockCache
+from compress import minify_html
+from template import Template
+from textnode import PageIndex, markdown_to_html_node
+
+# the Renderer a pool worker renders with
+_worker = None
+
+
+class Renderer:
+    # renders markdown held in memory, no filesystem involved. Everything that
+    # can be reused between calls lives here: the block cache, the parsed
+    # template and, for render_many(jobs=N), a pool of worker processes that
+    # each hold a copy of this renderer. Patterns are compiled once at import
+    # (see grammar.py).
+    def __init__(self, template=None, cache_size=4096, minify=False, jobs=1):
+        self.template_source = template
+        self.template = Template(template) if template is not None else None
+        self.wants_title = self.template is not None and "Title" in self.template.slots()
+        self.cache_size = cache_size
+        self.cache = BlockCache(cache_size) if cache_size > 0 else None
+        self.minify = minify
+        self.jobs = jobs or os.cpu_count()
+        self.pool = None
+        self.pool_jobs = 0
+
+    def __repr__(self):
+        return f"Renderer(template={self.template}, cache={self.cache}, jobs={self.jobs})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def render(self, markdown):
+        if self.template is None:
+            html = markdown_to_html_node(markdown, self.cache).to_html()
+        else:
+            index = PageIndex() if self.wants_title else None
+            content = markdown_to_html_node(markdown, self.cache, index)
+            title = index.title if index is not None else None
+            html = self.template.render({"Content": content, "Title": title or ""})
+        return minify_html(html) if self.minify else html
+
+    def render_many(self, markdowns, jobs=None):
+        # HTML strings in input order
+        jobs = self.jobs if jobs is None else jobs or os.cpu_count()
+        markdowns = list(markdowns)
+        if jobs <= 1 or len(markdowns) < 2:
+            return list(map(self.render, markdowns))
+        if self.pool is None or self.pool_jobs != jobs:
+            self.close()
+            self.pool_jobs = jobs
+            self.pool = ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=init_worker,
+                initargs=(self.template_source, self.cache_size, self.minify),
+            )
+        chunksize = max(1, len(markdowns) // (jobs * 4))
+        return list(self.pool.map(render_one, markdowns, chunksize=chunksize))
+
+
+def init_worker(template, cache_size, minify):
+    global _worker
+    log.init_worker()
+    _worker = Renderer(template, cache_size, minify)
+
+
+def render_one(markdown):
+    return _worker.render(markdown)
@@ -0,0 +1,314 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+from corpus import generate_markdown, generate_site
+from main import main as run_main
+from main import remove_orphans
+from textnode import TextNode, TextType, split_nodes_delimiter, text_to_textnodes
+
+# Each scenario is measured at a few sizes doubling up to its maximum, every
+# point in a forked child so it gets its own peak RSS. A scenario fails when
+# its largest point is over budget or its time grows faster than linear.
+
+# seconds per unit at the largest size; generous, they catch order of
+# magnitude regressions rather than noise
+BUDGETS = {
+    "pages": 0.02,
+    "depth": 0.02,
+    "spans": 50e-6,
+    "split": 50e-6,
+    "links": 50e-6,
+    "big_file": 3.0,
+}
+# peak RSS growth in MB per unit between the smallest and largest size, about
+# three times what was measured. A page costs ~3.5 KB of manifest and index
+# entries. Paths in the depth scenario grow with the depth, so its cost per
+# level does too (~19 KB at 1000 levels). Spans cost well under 1 KB each. A
+# streamed source still collects its links for the site index, but holding
+# the whole page tree costs more than twice the big_file budget.
+MEMORY_BUDGETS = {
+    "pages": 0.01,
+    "depth": 0.06,
+    "spans": 0.002,
+    "split": 0.002,
+    "links": 0.002,
+    "big_file": 2.0,
+}
+# fitted exponent of time against size above which growth is superlinear.
+# Every path in the depth scenario is as long as the tree is deep, so the
+# kernel resolves n components per file there and n^2 is expected.
+MAX_EXPONENT = 1.3
+MAX_EXPONENTS = {"depth": 2.3}
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build_site(root, n):
+    os.chdir(root)
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_main([])
+
+
+def make_pages(root, n):
+    generate_site(root, pages=n, blocks=5, depth=3)
+
+
+def make_deep_tree(root, n):
+    # one page and one static file on every level of an n level deep chain
+    generate_site(root, pages=1, blocks=5, depth=0)
+    content = os.path.join(root, "content")
+    static = os.path.join(root, "static")
+    for i in range(n):
+        content = os.path.join(content, "d")
+        static = os.path.join(static, "d")
+        os.makedirs(content)
+        os.makedirs(static)
+        with open(os.path.join(content, f"p{i}.md"), "w") as f:
+            f.write(f"# Level {i}\n\n*deep* page")
+        with open(os.path.join(static, f"s{i}.css"), "w") as f:
+            f.write("p {}\n")
+
+
+def span_text(n):
+    return " ".join(f"*w{i}*" for i in range(n))
+
+
+def make_spans(root, n):
+    # a single paragraph with n emphasis spans
+    generate_site(root, pages=0)
+    with open(os.path.join(root, "content", "index.md"), "w") as f:
+        f.write("# Spans\n\n" + span_text(n))
+
+
+def make_big_file(root, n):
+    # a single source of about n MB, over the streaming threshold
+    generate_site(root, pages=0)
+    blocks = []
+    size = 0
+    seed = 0
+    while size < n << 20:
+        chunk = generate_markdown(1000, seed)
+        blocks.append(chunk)
+        size += len(chunk) + 2
+        seed += 1
+    with open(os.path.join(root, "content", "index.md"), "w") as f:
+        f.write("\n\n".join(blocks))
+
+
+def split_spans(root, n):
+    split_nodes_delimiter([TextNode(span_text(n), TextType.TEXT)], "*", TextType.ITALIC)
+
+
+LINK_SPANS = (" [l{i}](/u{i})", " ![i{i}](/i{i}.png)")
+UNCLOSED_SPANS = (" [a{i}](b", " [x{i}", " ![x{i}", " ![a{i}](")
+
+
+def link_text(n):
+    # n spans on one line: links and images, then as many openers that never
+    # close, which a tokenizer rescanning for closers handles in n^2
+    half = n // 2
+    return "".join(LINK_SPANS[i % 2].format(i=i) for i in range(half)) + "".join(
+        UNCLOSED_SPANS[i % 4].format(i=i) for i in range(n - half)
+    )
+
+
+def tokenize_links(root, n):
+    text_to_textnodes(link_text(n))
+
+
+SCENARIOS = {
+    # name -> (setup, timed run, unit)
+    "pages": (make_pages, build_site, "page"),
+    "depth": (make_deep_tree, build_site, "level"),
+    "spans": (make_spans, build_site, "span"),
+    "split": (lambda root, n: None, split_spans, "span"),
+    "links": (lambda root, n: None, tokenize_links, "span"),
+    "big_file": (make_big_file, build_site, "MB"),
+}
+
+
+def run_child(conn, fn, root, n):
+    try:
+        start_rss = rss_mb()
+        start = time.perf_counter()
+        fn(root, n)
+        seconds = time.perf_counter() - start
+        peak = peak_rss_mb()
+        conn.send({"seconds": seconds, "peak_mb": peak, "growth_mb": peak - start_rss})
+    except BaseException as e:
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+
+
+def measure(fn, root, n):
+    ctx = multiprocessing.get_context("fork")
+    receiver, sender = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=run_child, args=(sender, fn, root, n))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {"error": "child died"}
+    process.join()
+    return result
+
+
+def fit_exponent(sizes, seconds):
+    # least squares slope of log(seconds) against log(size): 1 is linear
+    xs = [math.log(x) for x in sizes]
+    ys = [math.log(max(y, 1e-9)) for y in seconds]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if not var:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var
+
+
+def sizes_up_to(largest, points):
+    return sorted({max(1, largest >> i) for i in range(points)})
+
+
+def run_scenario(name, largest, points=4):
+    setup, run, unit = SCENARIOS[name]
+    result = {"unit": unit, "points": [], "failures": []}
+    for n in sizes_up_to(largest, points):
+        root = tempfile.mkdtemp(prefix="scaling-")
+        try:
+            setup(root, n)
+            point = measure(run, root, n)
+        finally:
+            # shutil.rmtree recurses once per level, too deep for the depth scenario
+            remove_orphans(root, ())
+            os.rmdir(root)
+        point["n"] = n
+        result["points"].append(point)
+        if "error" in point:
+            result["failures"].append(f"{name} at {n} {unit}s: {point['error']}")
+            return result
+
+    points = result["points"]
+    last = points[-1]
+    result["seconds_per_unit"] = last["seconds"] / last["n"]
+    if result["seconds_per_unit"] > BUDGETS[name]:
+        result["failures"].append(
+            f"{name}: {result['seconds_per_unit']:.6f}s per {unit}, budget {BUDGETS[name]}s"
+        )
+    if len(points) > 1:
+        first = points[0]
+        result["mb_per_unit"] = (last["growth_mb"] - first["growth_mb"]) / (last["n"] - first["n"])
+        if result["mb_per_unit"] > MEMORY_BUDGETS.get(name, math.inf):
+            result["failures"].append(
+                f"{name}: {result['mb_per_unit']:.2f} MB more peak memory per {unit}, "
+                f"budget {MEMORY_BUDGETS[name]} MB"
+            )
+        result["exponent"] = fit_exponent(
+            [p["n"] for p in points], [p["seconds"] for p in points]
+        )
+        limit = MAX_EXPONENTS.get(name, MAX_EXPONENT)
+        if result["exponent"] is not None and result["exponent"] > limit:
+            result["failures"].append(
+                f"{name}: time grows as n^{result['exponent']:.2f}, limit n^{limit}"
+            )
+    return result
+
+
+def run_all(sizes, points=4):
+    result = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {"sizes": sizes, "points": points},
+        "scenarios": {},
+    }
+    for name, largest in sizes.items():
+        result["scenarios"][name] = run_scenario(name, largest, points)
+    result["failures"] = [
+        failure for scenario in result["scenarios"].values() for failure in scenario["failures"]
+    ]
+    return result
+
+
+def compare(result, baseline, threshold):
+    regressions = []
+    for name, current in result["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous or "seconds_per_unit" not in previous or "seconds_per_unit" not in current:
+            continue
+        ratio = current["seconds_per_unit"] / previous["seconds_per_unit"]
+        print(
+            f"{name:10} {previous['seconds_per_unit']:.6f}s -> "
+            f"{current['seconds_per_unit']:.6f}s per {current['unit']} ({ratio:.2f}x)"
+        )
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check how builds scale with site size")
+    parser.add_argument("--pages", type=int, default=100000, help="largest number of pages")
+    parser.add_argument("--depth", type=int, default=1000, help="deepest directory chain")
+    parser.add_argument(
+        "--spans", type=int, default=20000, help="emphasis or link spans in a paragraph"
+    )
+    parser.add_argument("--mb", type=int, default=32, help="size of the single big source")
+    parser.add_argument("--points", type=int, default=4, help="sizes measured per scenario")
+    parser.add_argument("--only", action="append", choices=SCENARIOS, help="run only these")
+    parser.add_argument("-o", "--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.5,
+        help="fail when a scenario is this many times slower per unit than the baseline",
+    )
+    args = parser.parse_args(argv)
+
+    sizes = {
+        "pages": args.pages,
+        "depth": args.depth,
+        "spans": args.spans,
+        "split": args.spans,
+        "links": args.spans,
+        "big_file": args.mb,
+    }
+    if args.only:
+        sizes = {name: sizes[name] for name in args.only}
+    result = run_all(sizes, args.points)
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    failures = list(result["failures"])
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures += [f"{name}: slower than baseline" for name in compare(result, baseline, args.threshold)]
+    if failures:
+        raise SystemExit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+import functools
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from manifest import load_manifest
+
+logger = logging.getLogger("server")
+
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SCRIPT = (
+    b'<script>new EventSource("' + LIVERELOAD_PATH.encode() + b'")'
+    b".onmessage = () => location.reload();</script>"
+)
+# Accept-Encoding token -> suffix of the precompressed sibling, best first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class Reloader:
+    def __init__(self):
+        self.version = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout=None):
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.version != version or self.closed, timeout
+            )
+            return self.version
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+def manifest_etags(manifest):
+    # output path -> content hash. Compressed outputs recorded the hash of the
+    # page itself; otherwise a page is identified by its source, template and
+    # settings, and a static file by its source
+    if manifest is None:
+        return {}
+    etags = {}
+    template = (manifest.get("template") or {}).get("hash", "")
+    for section in ("pages", "static"):
+        for entry in manifest[section].values():
+            if entry.get("compressed"):
+                digest = entry["compressed"]["hash"]
+            elif section == "pages":
+                key = f"{entry['hash']}:{template}:{manifest.get('minify', False)}"
+                digest = hashlib.sha256(key.encode()).hexdigest()
+            else:
+                digest = entry["hash"]
+            etags[os.path.abspath(entry["output"])] = digest[:20]
+    return etags
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for item in (header or "").split(","):
+        name, _, params = item.partition(";")
+        params = params.replace(" ", "")
+        if name.strip() and params not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def etag_matches(header, etag):
+    # If-None-Match compares weakly, and * matches any file that exists
+    tags = [tag.strip() for tag in (header or "").split(",")]
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+class SiteFiles:
+    # what the server knows about public/: ETags from the build manifest and a
+    # bounded LRU of small file bodies, checked against the file's stat
+    def __init__(self, manifest_path=None, cache_bytes=32 << 20, max_file_bytes=1 << 20):
+        self.manifest_path = manifest_path
+        self.manifest_key = None
+        self.cache_bytes = cache_bytes
+        self.max_file_bytes = max_file_bytes
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.reload(None)
+        self.refresh()
+
+    def reload(self, manifest):
+        with self.lock:
+            self.etags = manifest_etags(manifest)
+            self.cache.clear()
+            self.size = 0
+
+    def refresh(self):
+        # every build rewrites the manifest, wherever it runs, so a changed
+        # stat means the ETags may have changed; rebuilds that produce the
+        # same outputs keep them
+        if self.manifest_path is None:
+            return
+        try:
+            st = os.stat(self.manifest_path)
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            key = None
+        if key != self.manifest_key:
+            self.reload(load_manifest(self.manifest_path) if key else None)
+            self.manifest_key = key
+
+    def etag(self, path, suffix, st):
+        digest = self.etags.get(path)
+        if digest is None:
+            digest = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+        return f'"{digest}{suffix.replace(".", "-")}"'
+
+    def read(self, path, st):
+        # None for files too big to cache; they are sent with sendfile
+        if st.st_size > self.max_file_bytes:
+            return None
+        key = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            cached = self.cache.get(path)
+            if cached is not None and cached[0] == key:
+                self.cache.move_to_end(path)
+                self.hits += 1
+                return cached[1]
+        with open(path, "rb") as f:
+            data = f.read()
+        with self.lock:
+            self.misses += 1
+            old = self.cache.pop(path, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self.cache[path] = (key, data)
+            self.size += len(data)
+            while self.size > self.cache_bytes:
+                _, (_, evicted) = self.cache.popitem(last=False)
+                self.size -= len(evicted)
+        return data
+
+
+class SiteRequestHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes on kept-alive connections
+    disable_nagle_algorithm = True
+    site = None
+    max_age = 0
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        self.send_site_file()
+
+    def do_HEAD(self):
+        self.send_site_file(head=True)
+
+    def resolve(self):
+        url_path = self.path.split("?", 1)[0].split("#", 1)[0]
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not url_path.endswith("/"):
+                return path, url_path + "/"
+            path = os.path.join(path, "index.html")
+        return path, None
+
+    def send_site_file(self, head=False):
+        path, redirect = self.resolve()
+        if redirect is not None:
+            self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+            self.send_header("Location", redirect)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+
+        accepted = accepted_encodings(self.headers.get("Accept-Encoding"))
+        encoding = suffix = None
+        variants = False
+        for name, ext in ENCODINGS:
+            if os.path.isfile(path + ext):
+                variants = True
+                if encoding is None and name in accepted:
+                    encoding, suffix = name, ext
+        served = path + suffix if encoding else path
+        st = os.stat(served)
+        self.site.refresh()
+        etag = self.site.etag(os.path.abspath(path), suffix or "", st)
+
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_cache_headers(etag, variants, path)
+            self.end_headers()
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(st.st_size))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_cache_headers(etag, variants, path)
+        self.end_headers()
+        if head:
+            return
+        data = self.site.read(served, st)
+        if data is not None:
+            self.wfile.write(data)
+            return
+        self.wfile.flush()
+        with open(served, "rb") as f:
+            self.connection.sendfile(f)
+
+    def send_cache_headers(self, etag, variants, path=""):
+        self.send_header("ETag", etag)
+        if self.max_age and not path.endswith(".html"):
+            self.send_header("Cache-Control", f"public, max-age={self.max_age}")
+        else:
+            self.send_header("Cache-Control", "no-cache")
+        if variants:
+            self.send_header("Vary", "Accept-Encoding")
+
+
+class DevRequestHandler(SiteRequestHandler):
+    reloader = None
+
+    def do_GET(self):
+        if self.reloader is None:
+            return super().do_GET()
+        if self.path == LIVERELOAD_PATH:
+            return self.send_events()
+        path, redirect = self.resolve()
+        if redirect is None and path.endswith(".html") and os.path.isfile(path):
+            return self.send_html(path)
+        super().do_GET()
+
+    def send_html(self, path):
+        with open(path, "rb") as f:
+            body = f.read()
+        i = body.rfind(b"</body>")
+        if i == -1:
+            body += LIVERELOAD_SCRIPT
+        else:
+            body = body[:i] + LIVERELOAD_SCRIPT + body[i:]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        version = self.reloader.version
+        try:
+            while not self.reloader.closed:
+                new_version = self.reloader.wait(version, timeout=15)
+                if self.reloader.closed:
+                    break
+                if new_version != version:
+                    version = new_version
+                    self.wfile.write(b"data: reload\n\n")
+                else:
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+
+def make_server(directory, host="localhost", port=8888, reloader=None, site=None, max_age=0):
+    attrs = {"reloader": reloader, "site": site or SiteFiles(), "max_age": max_age}
+    handler = type("Handler", (DevRequestHandler,), attrs)
+    return ThreadingHTTPServer(
+        (host, port), functools.partial(handler, directory=directory)
+    )
+
+
+def start_server(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
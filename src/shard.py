@@ -0,0 +1,201 @@
+import hashlib
+import heapq
+import json
+import os
+
+from assets import place_file
+from fsio import imap, make_dirs
+from manifest import empty_manifest, load_manifest
+
+SHARD_MANIFEST = ".shard-manifest.json"
+
+
+class MergeError(Exception):
+    def __init__(self, problems):
+        super().__init__(f"{len(problems)} problems merging shards")
+        self.problems = problems
+
+
+def parse_shard(text):
+    # "2/4" -> (2, 4); shards are numbered from 1
+    index, sep, count = text.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, not {text!r}")
+    if not sep or count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard must look like i/N with 1 <= i <= N, not {text!r}")
+    return index, count
+
+
+def shard_dir(public_dir, index, count):
+    return f"{public_dir}-shard-{index}-of-{count}"
+
+
+def path_hash(path):
+    return hashlib.sha1(path.encode()).hexdigest()
+
+
+def plan_shards(sizes, count):
+    # source -> shard number. Biggest files first, each onto the shard with the
+    # least bytes so far; equal sizes are ordered by path hash and equal loads
+    # by shard number, so every machine computes the same plan from the same tree
+    order = sorted(sizes, key=lambda source: (-sizes[source], path_hash(source)))
+    loads = [(0, index) for index in range(1, count + 1)]
+    plan = {}
+    for source in order:
+        load, index = heapq.heappop(loads)
+        plan[source] = index
+        heapq.heappush(loads, (load + sizes[source], index))
+    return plan
+
+
+def plan_digest(plan):
+    return hashlib.sha256(json.dumps(sorted(plan.items())).encode()).hexdigest()
+
+
+def shard_info(plan, index, count, public_dir, settings):
+    # settings holds everything besides the sources that shapes the outputs:
+    # the template hash and the build flags
+    return {
+        "index": index,
+        "count": count,
+        "plan": plan_digest(plan),
+        "settings": settings,
+        "public_dir": public_dir,
+        "sources": sorted(source for source, shard in plan.items() if shard == index),
+    }
+
+
+def load_shards(dirs):
+    shards = []
+    for path in dirs:
+        manifest = load_manifest(os.path.join(path, SHARD_MANIFEST))
+        shards.append((path, manifest))
+    return shards
+
+
+def check_shards(shards):
+    # everything that would make the merged site differ from a single build
+    problems = []
+    infos = [(path, manifest.get("shard")) for path, manifest in shards]
+    for path, info in infos:
+        if info is None:
+            problems.append(f"{path}: no shard manifest")
+    infos = [(path, info) for path, info in infos if info is not None]
+    if not infos:
+        return problems
+
+    count = infos[0][1]["count"]
+    seen = {}
+    for path, info in infos:
+        if info["count"] != count:
+            problems.append(f"{path}: shard of {info['count']}, expected {count}")
+        elif info["index"] in seen:
+            problems.append(f"{path}: shard {info['index']} already given as {seen[info['index']]}")
+        else:
+            seen[info["index"]] = path
+    for index in range(1, count + 1):
+        if index not in seen:
+            problems.append(f"shard {index}/{count} is missing")
+
+    plan = {}
+    for path, info in infos:
+        for source in info["sources"]:
+            if source in plan:
+                problems.append(f"{source}: assigned to shards {plan[source]} and {info['index']}")
+            plan[source] = info["index"]
+    if not problems:
+        for path, info in infos:
+            if info["plan"] != plan_digest(plan):
+                problems.append(f"{path}: planned from a different tree than the other shards")
+
+    first_path, first = infos[0]
+    settings = first.get("settings") or {}
+    for path, info in infos[1:]:
+        other = info.get("settings") or {}
+        for key in sorted(set(settings) | set(other)):
+            if settings.get(key) != other.get(key):
+                problems.append(
+                    f"{path}: built with {key} {other.get(key)!r}, "
+                    f"but {first_path} with {settings.get(key)!r}"
+                )
+
+    owners = {}
+    for path, manifest in shards:
+        info = manifest.get("shard")
+        if info is None:
+            continue
+        built = set(manifest["pages"]) | set(manifest["static"])
+        for source in sorted(set(info["sources"]) - built):
+            problems.append(f"{source}: not built by shard {info['index']}")
+        for source in sorted(built - set(info["sources"])):
+            problems.append(f"{source}: built by shard {info['index']}, which it wasn't assigned to")
+        for section in ("pages", "static"):
+            for source, entry in manifest[section].items():
+                rel = os.path.relpath(entry["output"], info["public_dir"])
+                for name in [rel] + shard_siblings(entry, info):
+                    if name in owners:
+                        problems.append(f"{name}: written by both {owners[name]} and {source}")
+                    owners[name] = source
+                    if not os.path.isfile(os.path.join(path, name)):
+                        problems.append(f"{name}: missing from {path}")
+    return problems
+
+
+def shard_siblings(entry, info):
+    siblings = (entry.get("compressed") or {}).get("siblings", [])
+    return [os.path.relpath(sibling, info["public_dir"]) for sibling in siblings]
+
+
+def merge_shards(dirs, public_dir, mode="auto", workers=8):
+    # checks the shards, then places every output listed in their manifests
+    # under public_dir; returns the combined manifest and the number of files
+    # that had to be placed
+    shards = load_shards(dirs)
+    problems = check_shards(shards)
+    if problems:
+        raise MergeError(problems)
+
+    merged = empty_manifest()
+    placements = []
+    for path, manifest in sorted(shards, key=lambda shard: shard[1]["shard"]["index"]):
+        info = manifest["shard"]
+        merged["template"] = merged["template"] or manifest["template"]
+        merged["minify"] = manifest.get("minify", False)
+        for section in ("pages", "static"):
+            for source, entry in manifest[section].items():
+                entry = dict(entry)
+                names = [os.path.relpath(entry["output"], info["public_dir"])]
+                entry["output"] = os.path.join(public_dir, names[0])
+                if entry.get("compressed"):
+                    names += shard_siblings(entry, info)
+                    entry["compressed"] = dict(
+                        entry["compressed"],
+                        siblings=[os.path.join(public_dir, name) for name in names[1:]],
+                    )
+                merged[section][source] = entry
+                placements += [
+                    (os.path.join(path, name), os.path.join(public_dir, name)) for name in names
+                ]
+
+    make_dirs([os.path.dirname(dest) for _, dest in placements], workers)
+
+    def place(job):
+        # every place_file mode keeps the source mtime (copies and reflinks
+        # copy it, hard links share the inode), so an unchanged output is
+        # recognized by its stat alone
+        source, dest = job
+        try:
+            st = os.stat(dest)
+        except FileNotFoundError:
+            pass
+        else:
+            src = os.stat(source)
+            if (st.st_size, st.st_mtime_ns) == (src.st_size, src.st_mtime_ns):
+                return False
+        place_file(source, dest, mode)
+        return True
+
+    placed = sum(imap(place, placements, workers))
+    return merged, placed
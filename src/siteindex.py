@@ -0,0 +1,110 @@
+import json
+import os
+import posixpath
+import time
+from urllib.parse import urlsplit
+from xml.sax.saxutils import escape
+
+SITEMAP_NAME = "sitemap.xml"
+SEARCH_INDEX_NAME = "search-index.json"
+
+
+def page_url(output, public_dir):
+    rel = os.path.relpath(output, public_dir).replace(os.sep, "/")
+    if rel == "index.html":
+        return "/"
+    if rel.endswith("/index.html"):
+        return "/" + rel[: -len("index.html")]
+    return "/" + rel
+
+
+def resolve_link(link, base_url):
+    # site-relative path for internal links, None for anything external
+    parts = urlsplit(link)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = parts.path
+    if not path.startswith("/"):
+        path = posixpath.join(posixpath.dirname(base_url), path)
+    return posixpath.normpath(path)
+
+
+def link_exists(path, known):
+    path = path.rstrip("/") or "/"
+    return (
+        path in known
+        or f"{path}.html" in known
+        or f"{path.rstrip('/')}/index.html" in known
+    )
+
+
+def collect_pages(manifest, public_dir):
+    pages = []
+    for source, entry in manifest["pages"].items():
+        index = entry.get("index") or {}
+        pages.append(
+            {
+                "source": source,
+                "url": page_url(entry["output"], public_dir),
+                "mtime": entry["mtime"],
+                "title": index.get("title"),
+                "links": index.get("links", []),
+                "images": index.get("images", []),
+                "words": index.get("words", 0),
+                "text": index.get("text", ""),
+            }
+        )
+    pages.sort(key=lambda page: page["url"])
+    return pages
+
+
+def dangling_links(pages, outputs, public_dir):
+    known = {"/" + os.path.relpath(path, public_dir).replace(os.sep, "/") for path in outputs}
+    ret = []
+    for page in pages:
+        for kind in ("links", "images"):
+            for link in page[kind]:
+                path = resolve_link(link, page["url"])
+                if path is not None and not link_exists(path, known):
+                    ret.append({"source": page["source"], "kind": kind[:-1], "target": link})
+    return ret
+
+
+def sitemap(pages, site_url=""):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for page in pages:
+        lastmod = time.strftime("%Y-%m-%d", time.gmtime(page["mtime"] / 1e9))
+        lines.append(
+            f"  <url><loc>{escape(site_url.rstrip('/') + page['url'])}</loc>"
+            f"<lastmod>{lastmod}</lastmod></url>"
+        )
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+def search_index(pages):
+    return [
+        {"url": page["url"], "title": page["title"], "words": page["words"], "text": page["text"]}
+        for page in pages
+    ]
+
+
+def write_site_index(manifest, public_dir, outputs, site_url="", report_path=None):
+    pages = collect_pages(manifest, public_dir)
+    sitemap_path = os.path.join(public_dir, SITEMAP_NAME)
+    search_path = os.path.join(public_dir, SEARCH_INDEX_NAME)
+    with open(sitemap_path, "w", encoding="utf-8") as f:
+        f.write(sitemap(pages, site_url))
+    with open(search_path, "w") as f:
+        json.dump(search_index(pages), f, separators=(",", ":"))
+
+    generated = [sitemap_path, search_path]
+    dangling = dangling_links(pages, set(outputs) | set(generated), public_dir)
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump({"pages": len(pages), "dangling": dangling}, f, indent=2)
+            f.write("\n")
+    return generated, dangling
@@ -0,0 +1,64 @@
+import os
+import re
+
+from textnode import SOURCE_ENCODING
+
+PLACEHOLDER = re.compile(r"\{\{ *(\w+) *\}\}")
+
+_cache = {}
+
+
+class Template:
+    def __init__(self, source):
+        # even indexes hold literal text, odd indexes hold slot names; raw
+        # keeps each slot as written, for slots that get no value
+        self.parts = PLACEHOLDER.split(source)
+        self.raw = [m.group() for m in PLACEHOLDER.finditer(source)]
+
+    def __repr__(self):
+        return f"Template({self.slots()})"
+
+    def slots(self):
+        return self.parts[1::2]
+
+    def render(self, values):
+        ret = []
+        for i, part in enumerate(self.parts):
+            if i % 2 == 0:
+                ret.append(part)
+            elif part not in values:
+                ret.append(self.raw[i // 2])
+            else:
+                value = values[part]
+                ret.append(value.to_html() if hasattr(value, "to_html") else str(value))
+        return "".join(ret)
+
+    def write(self, fp, values):
+        # nodes are streamed with write_html instead of being rendered to a string
+        for i, part in enumerate(self.parts):
+            if i % 2 == 0:
+                fp.write(part)
+            elif part not in values:
+                fp.write(self.raw[i // 2])
+            else:
+                value = values[part]
+                if hasattr(value, "write_html"):
+                    value.write_html(fp)
+                else:
+                    fp.write(str(value))
+
+
+def load_template(path):
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, encoding=SOURCE_ENCODING) as f:
+        template = Template(f.read())
+    _cache[path] = (key, template)
+    return template
+
+
+def clear_cache():
+    _cache.clear()
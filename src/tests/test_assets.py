@@ -0,0 +1,80 @@
+import errno
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import assets
+from assets import sync_static
+
+
+class TestSyncStatic(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "public")
+        os.makedirs(self.source)
+        os.makedirs(self.dest)
+        self.files = []
+        for name in ("a.css", "b.png"):
+            with open(os.path.join(self.source, name), "w") as f:
+                f.write(name * 100)
+            self.files.append((os.path.join(self.source, name), os.path.join(self.dest, name)))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_copies_then_skips_unchanged(self):
+        entries, copied = sync_static(self.files, {}, workers=2)
+        self.assertEqual(2, copied)
+        _, copied = sync_static(self.files, entries, workers=2)
+        self.assertEqual(0, copied)
+        with open(self.files[1][1]) as f:
+            self.assertEqual("b.png" * 100, f.read())
+
+    def test_changed_file_is_recopied(self):
+        entries, _ = sync_static(self.files, {}, mode="copy")
+        with open(self.files[0][0], "w") as f:
+            f.write("changed")
+        entries, copied = sync_static(self.files, entries, mode="copy")
+        self.assertEqual(1, copied)
+        with open(self.files[0][1]) as f:
+            self.assertEqual("changed", f.read())
+
+    def test_hardlink_shares_inode(self):
+        sync_static(self.files, {}, mode="hardlink")
+        source, dest = self.files[0]
+        self.assertTrue(os.path.samefile(source, dest))
+
+    def test_temp_names_stay_out_of_the_tree(self):
+        # x.css.tmp used to be the temp file of x.css
+        for name in ("x.css", "x.css.tmp"):
+            with open(os.path.join(self.source, name), "w") as f:
+                f.write(name * 100)
+            self.files.append((os.path.join(self.source, name), os.path.join(self.dest, name)))
+        for mode in ("copy", "hardlink"):
+            sync_static(self.files, {}, mode=mode, workers=4)
+            for source, dest in self.files:
+                with open(dest) as f:
+                    self.assertEqual(os.path.basename(source) * 100, f.read())
+            self.assertEqual(sorted(os.listdir(self.source)), sorted(os.listdir(self.dest)))
+
+    def test_explicit_reflink_says_when_it_copies(self):
+        error = OSError(errno.EOPNOTSUPP, "Operation not supported")
+        with mock.patch.object(assets, "reflink_supported", True), mock.patch.object(
+            assets, "reflink_warned", False
+        ), mock.patch.object(assets, "reflink", side_effect=error):
+            with self.assertLogs("assets", "WARNING") as cm:
+                _, copied = sync_static(self.files, {}, mode="reflink", workers=1)
+        self.assertEqual(2, copied)
+        self.assertEqual(1, len(cm.output))
+        self.assertIn("copying instead", cm.output[0])
+
+    def test_checksum_mode(self):
+        entries, _ = sync_static(self.files, {}, mode="copy", checksum=True)
+        _, copied = sync_static(self.files, entries, mode="copy", checksum=True)
+        self.assertEqual(0, copied)
+
+
+if __name__ == "__main__":
+    unittest.main()
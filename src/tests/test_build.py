@@ -0,0 +1,239 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import main
+from main import BuildError, build
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class BuildTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write("template.html", TEMPLATE)
+        self.write("content/index.md", "# Home\n\nHello **world**")
+        self.write("content/blog/post.md", "# Post\n\nA post")
+        self.write("static/index.css", "body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def write(self, name, text):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        with open(self.path(name), "w") as f:
+            f.write(text)
+
+    def read(self, name):
+        with open(self.path(name)) as f:
+            return f.read()
+
+    def build(self, incremental=True, jobs=1, io_workers=0):
+        return build(
+            content_dir=self.path("content"),
+            static_dir=self.path("static"),
+            template_path=self.path("template.html"),
+            public_dir=self.path("public"),
+            manifest_path=self.path("manifest.json"),
+            incremental=incremental,
+            jobs=jobs,
+            io_workers=io_workers,
+        )
+
+
+class TestIncrementalBuild(BuildTestCase):
+    def test_full_build(self):
+        self.build(incremental=False)
+        self.assertEqual(
+            "<title>Home</title><body><div><h1>Home</h1><p>Hello <b>world</b></p></div></body>",
+            self.read("public/index.html"),
+        )
+        self.assertTrue(os.path.exists(self.path("public/blog/post.html")))
+        self.assertEqual("body {}", self.read("public/index.css"))
+
+    def test_only_changed_pages_rerender(self):
+        self.build()
+        with open(self.path("public/blog/post.html"), "a") as f:
+            f.write("marker")
+        self.write("content/index.md", "# Home\n\nChanged")
+        self.build()
+        self.assertIn("Changed", self.read("public/index.html"))
+        self.assertTrue(self.read("public/blog/post.html").endswith("marker"))
+
+    def test_template_change_rerenders_everything(self):
+        self.build()
+        self.write("template.html", "new {{ Content }}")
+        self.build()
+        self.assertTrue(self.read("public/blog/post.html").startswith("new "))
+
+    def test_deleted_sources_remove_outputs(self):
+        self.build()
+        os.remove(self.path("content/blog/post.md"))
+        os.remove(self.path("static/index.css"))
+        self.build()
+        self.assertFalse(os.path.exists(self.path("public/blog")))
+        self.assertFalse(os.path.exists(self.path("public/index.css")))
+        self.assertTrue(os.path.exists(self.path("public/index.html")))
+
+    def test_full_build_sweeps_stray_outputs(self):
+        self.build(incremental=False)
+        self.write("public/stale/old.html", "old")
+        self.build(incremental=False)
+        self.assertFalse(os.path.exists(self.path("public/stale")))
+        self.assertTrue(os.path.exists(self.path("public/index.css")))
+
+    def test_full_build_sweeps_deep_trees(self):
+        self.build(incremental=False)
+        # os.makedirs recurses once per level too
+        path = self.path("public")
+        for _ in range(1100):
+            path = os.path.join(path, "d")
+            os.mkdir(path)
+        with open(os.path.join(path, "old.html"), "w") as f:
+            f.write("old")
+        self.build(incremental=False)
+        self.assertFalse(os.path.exists(self.path("public/d")))
+
+    def test_large_pages_are_streamed(self):
+        self.write("content/big.md", "# Big\n\n" + "\n\n".join(f"*para* {i}" for i in range(500)))
+        self.build(incremental=False)
+        expected = self.read("public/big.html")
+        with mock.patch.object(main, "STREAM_THRESHOLD", 0):
+            self.build(incremental=False)
+        self.assertEqual(expected, self.read("public/big.html"))
+
+    def test_streamed_crlf_source_matches(self):
+        markdown = "# Big\r\n\r\n" + "\r\n\r\n".join(f"* item {i}\r\n* é {i}" for i in range(200))
+        with open(self.path("content/big.md"), "wb") as f:
+            f.write(markdown.encode("utf-8"))
+        self.build(incremental=False)
+        expected = self.read("public/big.html")
+        self.assertEqual(200, expected.count("<ul>"))
+        with mock.patch.object(main, "STREAM_THRESHOLD", 0):
+            self.build(incremental=False)
+        self.assertEqual(expected, self.read("public/big.html"))
+
+    def test_pages_are_utf8_under_c_locale(self):
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}—")
+        with open(self.path("content/index.md"), "wb") as f:
+            f.write("# Café".encode("utf-8"))
+        env = dict(os.environ, LC_ALL="C", PYTHONCOERCECLOCALE="0", PYTHONUTF8="0")
+        env.pop("PYTHONIOENCODING", None)
+        subprocess.run(
+            [sys.executable, main.__file__],
+            cwd=self.root,
+            env=env,
+            capture_output=True,
+            check=True,
+        )
+        with open(self.path("public/index.html"), "rb") as f:
+            page = f.read().decode("utf-8")
+        self.assertEqual("<title>Café</title><div><h1>Café</h1></div>—", page)
+
+    def test_outputs_get_the_default_mode(self):
+        self.build()
+        umask = os.umask(0)
+        os.umask(umask)
+        for name in ("public/index.html", "manifest.json"):
+            self.assertEqual(0o666 & ~umask, os.stat(self.path(name)).st_mode & 0o777, name)
+        self.assertEqual([], [name for name in os.listdir(self.root) if name.endswith(".tmp")])
+
+    def test_static_checksum(self):
+        def build_static(**kwargs):
+            build(
+                content_dir=self.path("content"),
+                static_dir=self.path("static"),
+                template_path=self.path("template.html"),
+                public_dir=self.path("public"),
+                manifest_path=self.path("manifest.json"),
+                static_mode="copy",
+                **kwargs,
+            )
+
+        build_static()
+        # a fresh checkout: same content, new mtime
+        os.utime(self.path("static/index.css"), ns=(0, 10**18))
+        with mock.patch("assets.place_file") as place_file:
+            build_static(static_checksum=True)
+        place_file.assert_not_called()
+        with mock.patch("assets.place_file") as place_file:
+            build_static()
+        place_file.assert_called_once()
+
+    def test_missing_output_is_rebuilt(self):
+        self.build()
+        os.remove(self.path("public/index.html"))
+        self.build()
+        self.assertTrue(os.path.exists(self.path("public/index.html")))
+
+
+class TestParallelBuild(BuildTestCase):
+    def test_parallel_matches_serial(self):
+        for i in range(10):
+            self.write(f"content/many/page{i}.md", f"# Page {i}\n\n*text* {i}")
+        self.build(incremental=False)
+        serial = self.read("public/many/page7.html")
+        self.build(incremental=False, jobs=3)
+        self.assertEqual(serial, self.read("public/many/page7.html"))
+
+    def test_errors_are_reported_per_file(self):
+        self.write("content/broken.md", "no header here")
+        with self.assertRaises(BuildError) as ctx:
+            self.build(jobs=2)
+        self.assertEqual([self.path("content/broken.md")], list(ctx.exception.errors))
+        self.assertIn("ValueError", ctx.exception.errors[self.path("content/broken.md")])
+        self.assertTrue(os.path.exists(self.path("public/blog/post.html")))
+
+    def test_worker_logs_are_flushed(self):
+        for i in range(6):
+            self.write(f"content/many/page{i}.md", f"# Page {i}")
+        err = subprocess.run(
+            [sys.executable, main.__file__, "-v", "-j", "2"],
+            cwd=self.root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stderr
+        self.assertEqual(8, err.count("Generating page"), err)
+
+
+class TestStartup(BuildTestCase):
+    def test_heavy_modules_are_imported_lazily(self):
+        heavy = ["textnode", "server", "daemon", "sqlite3", "http.server", "multiprocessing"]
+        code = f"import sys, main; print([m for m in {heavy!r} if m in sys.modules])"
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=os.path.dirname(main.__file__),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        self.assertEqual("[]", out.strip())
+
+    def test_timings(self):
+        timings = {}
+        build(
+            content_dir=self.path("content"),
+            static_dir=self.path("static"),
+            template_path=self.path("template.html"),
+            public_dir=self.path("public"),
+            manifest_path=self.path("manifest.json"),
+            timings=timings,
+        )
+        self.assertEqual({"walk", "render", "write"}, set(timings))
+        timings["import"] = 0.05
+        self.assertEqual(
+            "Timings: import 50.0 ms, walk 0.0 ms, render 0.0 ms, write 0.0 ms, total 100.0 ms",
+            main.format_timings(dict(timings, walk=0, render=0, write=0), 0.1),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+
+from cache import BlockCache
+from corpus import generate_markdown
+from textnode import markdown_to_html_node
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_lru_bound(self):
+        cache = BlockCache(maxsize=2)
+        cache.put("a", ("<p>a</p>", None))
+        cache.put("b", ("<p>b</p>", None))
+        cache.get("a")
+        cache.put("c", ("<p>c</p>", None))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(("<p>a</p>", None), cache.get("a"))
+        self.assertEqual({"hits": 2, "misses": 1}, cache.stats())
+
+    def test_same_html_with_cache(self):
+        markdown = generate_markdown(100)
+        cache = BlockCache()
+        expected = markdown_to_html_node(markdown).to_html()
+        self.assertEqual(expected, markdown_to_html_node(markdown, cache).to_html())
+        self.assertEqual(expected, markdown_to_html_node(markdown, cache).to_html())
+        self.assertEqual(101, cache.hits)
+
+    def test_disk_store_persists(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.sqlite")
+            cache = BlockCache(path=path)
+            markdown_to_html_node("# Title\n\nSome *text*", cache)
+            cache.close()
+            cache = BlockCache(path=path)
+            html, meta = cache.get("Some *text*")
+            self.assertEqual("<p>Some <i>text</i></p>", html)
+            self.assertEqual(2, meta["words"])
+            cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
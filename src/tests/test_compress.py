@@ -0,0 +1,111 @@
+import gzip
+import io
+import os
+import unittest
+from unittest import mock
+
+import main
+from compress import FORMATS, MIN_SIZE, MinifyWriter, minify_html
+from tests.test_build import BuildTestCase
+
+PAGE = "# Home\n\n" + "\n\n".join(f"Paragraph *{i}* with some words" for i in range(40))
+
+
+class TestMinify(unittest.TestCase):
+    def test_block_whitespace_is_dropped(self):
+        self.assertEqual(
+            "<html><body><div><p>a</p></div></body></html>",
+            minify_html("<html>\n  <body>\n    <div> <p>a</p>\n </div>\n</body>\n</html>\n"),
+        )
+
+    def test_inline_whitespace_collapses(self):
+        self.assertEqual(
+            "<p>a <b>x</b>\n<i>y</i> z</p>", minify_html("<p>a   <b>x</b>\n   <i>y</i>  z</p>")
+        )
+
+    def test_pre_is_preserved(self):
+        html = "<div>\n<pre><code>a\n    b\n</code></pre>\n</div>"
+        self.assertEqual("<div><pre><code>a\n    b\n</code></pre></div>", minify_html(html))
+
+    def test_inline_preserved_elements_keep_spaces(self):
+        html = "<p><label>Name</label> <textarea>\n x</textarea> <b>x</b></p>\n<pre>a</pre>\n"
+        self.assertEqual(
+            "<p><label>Name</label> <textarea>\n x</textarea> <b>x</b></p><pre>a</pre>",
+            minify_html(html),
+        )
+
+    def test_writer_matches_whole_page(self):
+        html = "<html>\n<body>\n" + "".join(
+            f"<div>\n  <p>a  <b>{i}</b>\n <i>x</i> </p>\n<pre>  {i}\n  </pre> <textarea> t </textarea>\n</div>\n"
+            for i in range(200)
+        ) + "</body>\n</html>\n"
+        out = io.StringIO()
+        with mock.patch.object(MinifyWriter, "CHUNK", 7):
+            writer = MinifyWriter(out)
+            for i in range(0, len(html), 5):
+                writer.write(html[i : i + 5])
+            writer.finish()
+        self.assertEqual(minify_html(html), out.getvalue())
+
+
+class TestCompressedBuild(BuildTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("content/index.md", PAGE)
+        self.write("static/site.js", "// " + "x" * MIN_SIZE)
+
+    def build_compressed(self, incremental=True, compress=True):
+        return main.build(
+            content_dir=self.path("content"),
+            static_dir=self.path("static"),
+            template_path=self.path("template.html"),
+            public_dir=self.path("public"),
+            manifest_path=self.path("manifest.json"),
+            incremental=incremental,
+            minify=True,
+            compress=compress,
+        )
+
+    def test_siblings_match_outputs(self):
+        self.build_compressed()
+        for name in ("public/index.html", "public/site.js"):
+            with open(self.path(name), "rb") as f, gzip.open(self.path(name + ".gz")) as gz:
+                self.assertEqual(f.read(), gz.read())
+        # too small to be worth it
+        self.assertFalse(os.path.exists(self.path("public/index.css.gz")))
+
+    def test_pages_are_minified(self):
+        self.build_compressed()
+        self.assertNotIn("\n<p>", self.read("public/index.html"))
+
+    def test_streamed_pages_are_minified(self):
+        self.write("template.html", "<html>\n  <body>\n    {{ Content }}\n  </body>\n</html>\n")
+        self.build_compressed()
+        expected = self.read("public/index.html")
+        self.assertNotIn("\n", expected)
+        with mock.patch.object(main, "STREAM_THRESHOLD", 0):
+            self.build_compressed(incremental=False)
+        self.assertEqual(expected, self.read("public/index.html"))
+
+    def test_unchanged_outputs_are_skipped(self):
+        manifest = self.build_compressed()
+        self.assertTrue(manifest["pages"][self.path("content/index.md")]["compressed"]["siblings"])
+        with mock.patch("compress.compress_bytes") as compress_bytes:
+            self.build_compressed()
+            self.build_compressed(incremental=False)
+        compress_bytes.assert_not_called()
+
+        self.write("content/index.md", PAGE + "\n\nMore")
+        with mock.patch("compress.compress_bytes", return_value=b"x") as compress_bytes:
+            self.build_compressed()
+        self.assertEqual(len(FORMATS), compress_bytes.call_count)
+
+    def test_disabling_removes_siblings(self):
+        self.build_compressed()
+        self.build_compressed(compress=False)
+        self.assertFalse(os.path.exists(self.path("public/index.html.gz")))
+        self.assertTrue(os.path.exists(self.path("public/index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import random
+import tempfile
+import unittest
+
+from corpus import generate_markdown, generate_site, inline_text, parse_mix
+from textnode import block_to_block_type, markdown_to_blocks, markdown_to_html_node
+
+
+class TestCorpus(unittest.TestCase):
+    def test_deterministic(self):
+        self.assertEqual(generate_markdown(50, seed=3), generate_markdown(50, seed=3))
+        self.assertNotEqual(generate_markdown(50, seed=3), generate_markdown(50, seed=4))
+
+    def test_mix_controls_block_types(self):
+        mix = parse_mix("quote,code=2")
+        markdown = generate_markdown(40, mix=mix)
+        types = {block_to_block_type(b) for b in markdown_to_blocks(markdown)[1:]}
+        self.assertEqual({"quote", "code"}, types)
+
+    def test_no_emphasis(self):
+        text = inline_text(random.Random(1), words=200, emphasis=0)
+        self.assertFalse(set("*`[]!") & set(text))
+
+    def test_every_kind_renders(self):
+        markdown_to_html_node(generate_markdown(200)).to_html()
+
+    def test_generate_site(self):
+        with tempfile.TemporaryDirectory() as root:
+            paths = generate_site(root, pages=12, blocks=3, depth=2, fanout=3)
+            self.assertEqual(12, len(paths))
+            self.assertTrue(all(os.path.exists(p) for p in paths))
+            self.assertTrue(os.path.exists(os.path.join(root, "template.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import functools
+import os
+import threading
+
+import client
+import main
+from daemon import make_daemon
+from tests.test_build import BuildTestCase
+
+
+class TestBuildDaemon(BuildTestCase):
+    def setUp(self):
+        super().setUp()
+        self.socket_path = self.path("daemon.sock")
+        build = functools.partial(
+            main.build,
+            content_dir=self.path("content"),
+            static_dir=self.path("static"),
+            template_path=self.path("template.html"),
+            public_dir=self.path("public"),
+            manifest_path=self.path("manifest.json"),
+        )
+        self.scans = 0
+
+        def scan():
+            self.scans += 1
+            return main.scan_sources(self.path("static"), self.path("content"), self.path("public"))
+
+        self.server = make_daemon(
+            self.socket_path, build, scan, {}, (self.path("static"), self.path("content"))
+        )
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        super().tearDown()
+
+    def request(self, *args):
+        return client.request(self.socket_path, client.parse_args(args)[1])
+
+    def test_full_then_paths(self):
+        response = self.request("--full")
+        self.assertTrue(response["ok"])
+        self.assertIn("Rendered 2 pages", response["output"])
+
+        self.write("content/index.md", "# Home\n\nChanged")
+        response = self.request(self.path("content/index.md"))
+        self.assertIn("Rendered 1 pages", response["output"])
+        self.assertIn("Changed", self.read("public/index.html"))
+        self.assertEqual(1, self.scans)
+
+    def test_listed_paths_are_the_only_ones_checked(self):
+        self.request("--full")
+        self.write("content/blog/post.md", "# Post\n\nEdited but not listed")
+        self.write("content/index.md", "# Home\n\nListed")
+        self.request(self.path("content/index.md"))
+        self.assertIn("Listed", self.read("public/index.html"))
+        self.assertNotIn("Edited", self.read("public/blog/post.html"))
+
+    def test_new_and_deleted_files_rescan(self):
+        self.request("--full")
+        self.write("content/new.md", "# New")
+        self.request(self.path("content/new.md"))
+        self.assertTrue(os.path.exists(self.path("public/new.html")))
+        os.remove(self.path("content/new.md"))
+        self.request(self.path("content/new.md"))
+        self.assertFalse(os.path.exists(self.path("public/new.html")))
+        self.assertEqual(3, self.scans)
+
+    def test_directory_paths(self):
+        self.request("--full")
+        self.write("content/blog/post.md", "# Post\n\nEdited")
+        self.write("content/blog/more.md", "# More")
+        response = self.request(self.path("content/blog"))
+        self.assertIn("Rendered 2 pages", response["output"])
+        self.assertIn("Edited", self.read("public/blog/post.html"))
+        self.assertTrue(os.path.exists(self.path("public/blog/more.html")))
+        for name in ("post.md", "more.md"):
+            os.remove(self.path(f"content/blog/{name}"))
+        os.rmdir(self.path("content/blog"))
+        self.request(self.path("content/blog"))
+        self.assertFalse(os.path.exists(self.path("public/blog/post.html")))
+
+    def test_errors_are_returned(self):
+        self.write("content/broken.md", "no header here")
+        response = self.request()
+        self.assertFalse(response["ok"])
+        self.assertIn(self.path("content/broken.md"), response["errors"])
+        self.assertTrue(self.request()["ok"] is False)
+
+    def test_stop(self):
+        self.assertEqual("Stopping\n", self.request("--stop")["output"])
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
@@ -0,0 +1,144 @@
+import builtins
+import os
+import threading
+import time
+import unittest
+from contextlib import ExitStack
+from unittest import mock
+
+from fsio import make_dirs, pipeline, scan_tree
+from main import BuildError, collect_files
+from tests.test_build import BuildTestCase
+
+LATENCY = 0.005
+
+
+class SlowFS:
+    # stand-in for a network filesystem: every call under root costs a round trip
+    def __init__(self, root, latency=LATENCY):
+        self.root = root
+        self.latency = latency
+        self.calls = 0
+        self.in_flight = 0
+        # most calls ever waiting on a round trip at the same time
+        self.peak = 0
+        self.lock = threading.Lock()
+        self.stack = ExitStack()
+
+    def wrap(self, fn):
+        def slow(path, *args, **kwargs):
+            if str(os.fspath(path)).startswith(self.root):
+                with self.lock:
+                    self.calls += 1
+                    self.in_flight += 1
+                    self.peak = max(self.peak, self.in_flight)
+                time.sleep(self.latency)
+                with self.lock:
+                    self.in_flight -= 1
+            return fn(path, *args, **kwargs)
+
+        return slow
+
+    def __enter__(self):
+        self.stack.enter_context(mock.patch.object(builtins, "open", self.wrap(builtins.open)))
+        for name in ("scandir", "stat", "mkdir", "replace"):
+            self.stack.enter_context(mock.patch.object(os, name, self.wrap(getattr(os, name))))
+        return self
+
+    def __exit__(self, *exc):
+        self.stack.close()
+
+
+class TestPipeline(unittest.TestCase):
+    def test_results_in_order_and_overlapped(self):
+        # the first two reads wait for each other and the first write waits
+        # for a later item to be processed; one call at a time, neither could
+        written = []
+        both_reading = threading.Barrier(2, timeout=10)
+        later_processed = threading.Event()
+        overlapped = []
+
+        def read(item):
+            if item < 2:
+                both_reading.wait()
+            return item * 2
+
+        def process(item, load):
+            if item == 5:
+                later_processed.set()
+            return load(), load() + 1
+
+        def write(result, payload):
+            if result == 0:
+                overlapped.append(later_processed.wait(10))
+            written.append(payload)
+
+        results = pipeline(range(40), read, process, write, workers=8, depth=8)
+        self.assertEqual([i * 2 for i in range(40)], results)
+        self.assertEqual(sorted(i * 2 + 1 for i in range(40)), sorted(written))
+        self.assertEqual([True], overlapped)
+
+    def test_reads_stay_bounded(self):
+        in_flight = []
+        done = []
+
+        def read(item):
+            in_flight.append(item)
+            return item
+
+        def process(item, load):
+            done.append(load())
+            self.assertLessEqual(len(in_flight) - len(done), 4)
+            return item, None
+
+        pipeline(range(50), read, process, None, workers=4, depth=4)
+        self.assertEqual(list(range(50)), done)
+
+
+class TestTreeHelpers(BuildTestCase):
+    def test_scan_matches_serial(self):
+        for i in range(5):
+            self.write(f"content/d{i}/sub/page.md", "# x")
+        self.assertEqual(
+            collect_files(self.path("content"), "out"),
+            scan_tree(self.path("content"), "out", workers=4),
+        )
+
+    def test_make_dirs(self):
+        dirs = [self.path("out/a"), self.path("out/a/b/c"), self.path("out/a/b"), self.path("out/a")]
+        make_dirs(dirs, workers=4)
+        self.assertTrue(os.path.isdir(self.path("out/a/b/c")))
+
+
+class TestPipelinedBuild(BuildTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(16):
+            self.write(f"content/many/page{i}.md", f"# Page {i}\n\n*text* {i}")
+
+    def outputs(self):
+        return {
+            name: self.read(f"public/many/{name}")
+            for name in os.listdir(self.path("public/many"))
+        }
+
+    def test_matches_serial_build_and_overlaps_slow_calls(self):
+        with SlowFS(self.root) as fs:
+            self.build(incremental=False)
+            serial = self.outputs()
+            serial_peak, fs.peak = fs.peak, 0
+            self.build(incremental=False, io_workers=8)
+        self.assertEqual(serial, self.outputs())
+        self.assertEqual(1, serial_peak)
+        self.assertGreater(fs.peak, 1)
+
+    def test_errors_are_reported(self):
+        self.write("content/broken.md", "no header here")
+        with self.assertRaises(BuildError) as ctx:
+            self.build(io_workers=4)
+        self.assertEqual([self.path("content/broken.md")], list(ctx.exception.errors))
+        self.assertTrue(os.path.exists(self.path("public/many/page3.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
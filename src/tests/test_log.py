@@ -0,0 +1,46 @@
+import io
+import logging
+import unittest
+
+import log
+
+
+class TestLog(unittest.TestCase):
+    def tearDown(self):
+        log.configure()
+        logging.getLogger("textnode").setLevel(logging.NOTSET)
+
+    def test_parse_levels(self):
+        self.assertEqual(
+            {"textnode": logging.DEBUG, "main": logging.INFO},
+            log.parse_levels(["textnode=debug,main=INFO"]),
+        )
+        with self.assertRaises(ValueError):
+            log.parse_levels(["textnode"])
+        with self.assertRaises(ValueError):
+            log.parse_levels(["textnode=LOUD"])
+
+    def test_quiet_by_default_and_buffered(self):
+        out = io.StringIO()
+        log.configure(stream=out)
+        logging.getLogger("main").info("page")
+        logging.getLogger("main").warning("careful")
+        self.assertEqual("", out.getvalue())
+        log.flush()
+        self.assertEqual("WARNING main: careful\n", out.getvalue())
+
+    def test_unbuffered(self):
+        out = io.StringIO()
+        log.configure(1, stream=out, buffered=False)
+        logging.getLogger("server").info("GET /")
+        self.assertEqual("INFO server: GET /\n", out.getvalue())
+
+    def test_per_module_level(self):
+        out = io.StringIO()
+        log.configure(levels={"textnode": logging.DEBUG}, stream=out)
+        self.assertTrue(logging.getLogger("textnode").isEnabledFor(logging.DEBUG))
+        self.assertFalse(logging.getLogger("main").isEnabledFor(logging.INFO))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import profiling
+import textnode
+from main import build
+
+
+class TestProfiling(unittest.TestCase):
+    def test_enable_disable_restores_functions(self):
+        original = textnode.text_to_textnodes
+        profiling.enable()
+        self.assertIsNot(original, textnode.text_to_textnodes)
+        profiling.disable()
+        self.assertIs(original, textnode.text_to_textnodes)
+
+    def test_build_report(self):
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, "content"))
+            with open(os.path.join(root, "template.html"), "w") as f:
+                f.write("{{ Title }}{{ Content }}")
+            for i in range(3):
+                with open(os.path.join(root, "content", f"p{i}.md"), "w") as f:
+                    f.write(f"# Page {i}\n\nsome *text* here\n\n* a\n* b")
+            report_path = os.path.join(root, "profile.json")
+            cprofile_path = os.path.join(root, "page.prof")
+            # built twice in one process, where a block cache would be warm
+            for _ in range(2):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    build(
+                        content_dir=os.path.join(root, "content"),
+                        static_dir=os.path.join(root, "static"),
+                        template_path=os.path.join(root, "template.html"),
+                        public_dir=os.path.join(root, "public"),
+                        manifest_path=os.path.join(root, "manifest.json"),
+                        profile_path=report_path,
+                        profile_top=2,
+                        cprofile_page=os.path.join(root, "content", "p1.md"),
+                        cprofile_path=cprofile_path,
+                    )
+            with open(report_path) as f:
+                report = json.load(f)
+            self.assertEqual(3, report["pages"])
+            self.assertEqual(2, len(report["slowest"]))
+            self.assertEqual(9, report["counts"]["blocks"])
+            self.assertEqual(3 * 6, report["counts"]["text_nodes"])
+            self.assertEqual(
+                {"read", "parse", "inline", "serialize", "write"}, set(report["stages"])
+            )
+            self.assertTrue(os.path.exists(cprofile_path))
+            self.assertFalse(profiling.enabled)
+
+
+if __name__ == "__main__":
+    unittest.main()
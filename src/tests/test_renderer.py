@@ -0,0 +1,39 @@
+import unittest
+
+from renderer import Renderer
+from textnode import markdown_to_html_node
+
+SNIPPETS = [f"# Title {i}\n\nSome *text* {i} and `code`\n\n* a\n* b" for i in range(20)]
+
+
+class TestRenderer(unittest.TestCase):
+    def test_render_matches_markdown_to_html_node(self):
+        renderer = Renderer()
+        self.assertEqual(
+            [markdown_to_html_node(s).to_html() for s in SNIPPETS], renderer.render_many(SNIPPETS)
+        )
+        # the list block is shared by every snippet
+        self.assertEqual(19, renderer.cache.hits)
+
+    def test_template_and_title(self):
+        renderer = Renderer("<title>{{ Title }}</title>{{ Content }}", minify=True)
+        self.assertEqual(
+            "<title>Hi</title><div><h1>Hi</h1><p>x</p></div>", renderer.render("# Hi\n\nx")
+        )
+        self.assertEqual("<title></title><div><p>no header</p></div>", renderer.render("no header"))
+
+    def test_pool_keeps_order(self):
+        with Renderer("{{ Title }}", jobs=2) as renderer:
+            self.assertEqual([f"Title {i}" for i in range(20)], renderer.render_many(SNIPPETS))
+            self.assertEqual(["Title 0"], renderer.render_many(SNIPPETS[:1]))
+            self.assertEqual(["Title 1", "Title 2"], renderer.render_many(SNIPPETS[1:3]))
+        self.assertIsNone(renderer.pool)
+
+    def test_no_cache(self):
+        renderer = Renderer(cache_size=0)
+        self.assertIsNone(renderer.cache)
+        self.assertEqual(markdown_to_html_node(SNIPPETS[0]).to_html(), renderer.render(SNIPPETS[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
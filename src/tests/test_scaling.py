@@ -0,0 +1,48 @@
+import os
+import unittest
+
+from scaling import fit_exponent, run_all, run_scenario, sizes_up_to
+
+# the scenarios build real sites and take a while, so they only run on request
+SCALING = os.environ.get("SCALING")
+
+
+class TestFit(unittest.TestCase):
+    def test_fit_exponent(self):
+        sizes = [100, 200, 400, 800]
+        self.assertAlmostEqual(1.0, fit_exponent(sizes, [n * 0.01 for n in sizes]))
+        self.assertAlmostEqual(2.0, fit_exponent(sizes, [n * n * 1e-6 for n in sizes]))
+        self.assertIsNone(fit_exponent([5, 5], [1, 2]))
+
+    def test_sizes_up_to(self):
+        self.assertEqual([125, 250, 500, 1000], sizes_up_to(1000, 4))
+        self.assertEqual([1, 2], sizes_up_to(2, 4))
+
+
+class TestInline(unittest.TestCase):
+    # one small point each, so the normal test run still catches an inline
+    # tokenizer that went quadratic
+    def test_inline_scenarios_stay_within_budget(self):
+        for name in ("split", "links"):
+            result = run_scenario(name, 4000, points=1)
+            self.assertEqual([], result["failures"], name)
+
+
+@unittest.skipUnless(SCALING, "set SCALING=1 to run the scaling suite")
+class TestScaling(unittest.TestCase):
+    def test_scenarios_stay_within_budget(self):
+        result = run_all(
+            {
+                "pages": 2000,
+                "depth": 1000,
+                "spans": 20000,
+                "split": 20000,
+                "links": 20000,
+                "big_file": 8,
+            }
+        )
+        self.assertEqual([], result["failures"])
+
+
+if __name__ == "__main__":
+    unittest.main()
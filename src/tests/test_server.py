@@ -0,0 +1,180 @@
+import gzip
+import http.client
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.request
+
+from server import (
+    LIVERELOAD_PATH,
+    LIVERELOAD_SCRIPT,
+    Reloader,
+    SiteFiles,
+    accepted_encodings,
+    etag_matches,
+    make_server,
+    start_server,
+)
+from manifest import empty_manifest
+from watch import changed_paths, snapshot
+
+
+class TestDevServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "index.html"), "w") as f:
+            f.write("<html><body><p>hi</p></body></html>")
+        with open(os.path.join(self.tmp.name, "index.css"), "w") as f:
+            f.write("body {}")
+        self.reloader = Reloader()
+        self.server = make_server(self.tmp.name, port=0, reloader=self.reloader)
+        start_server(self.server)
+        self.url = "http://localhost:%d" % self.server.server_address[1]
+
+    def tearDown(self):
+        self.reloader.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=5) as response:
+            return response.read()
+
+    def test_html_gets_reload_script(self):
+        body = self.get("/")
+        self.assertEqual(
+            b"<html><body><p>hi</p>" + LIVERELOAD_SCRIPT + b"</body></html>", body
+        )
+
+    def test_other_files_are_untouched(self):
+        self.assertEqual(b"body {}", self.get("/index.css"))
+
+    def test_reload_event(self):
+        response = urllib.request.urlopen(self.url + LIVERELOAD_PATH, timeout=5)
+        threading.Timer(0.1, self.reloader.notify).start()
+        self.assertEqual(b"data: reload\n", response.readline())
+        response.close()
+
+
+class TestSiteServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.write("index.html", b"<p>home</p>")
+        self.write("index.html.gz", gzip.compress(b"<p>home</p>"))
+        self.write("big.bin", os.urandom(300_000))
+        self.write("docs/index.html", b"<p>docs</p>")
+        self.write("index.css", b"body {}")
+        self.manifest_path = os.path.join(self.tmp.name, "manifest.json")
+        self.save_manifest("abc123")
+        self.site = SiteFiles(self.manifest_path, cache_bytes=1 << 20, max_file_bytes=100_000)
+        self.server = make_server(self.tmp.name, port=0, site=self.site, max_age=60)
+        start_server(self.server)
+        self.conn = http.client.HTTPConnection("localhost", self.server.server_address[1], timeout=5)
+
+    def tearDown(self):
+        self.conn.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def save_manifest(self, css_hash):
+        manifest = empty_manifest()
+        css = os.path.abspath(os.path.join(self.tmp.name, "index.css"))
+        manifest["static"]["index.css"] = {"hash": css_hash, "output": css}
+        with open(self.manifest_path, "w") as f:
+            json.dump(manifest, f)
+
+    def get(self, path, method="GET", **headers):
+        self.conn.request(method, path, headers=headers)
+        response = self.conn.getresponse()
+        return response, response.read()
+
+    def test_etag_from_manifest_and_304(self):
+        response, body = self.get("/index.css")
+        self.assertEqual(b"body {}", body)
+        etag = response.getheader("ETag")
+        self.assertEqual('"abc123"', etag)
+        self.assertEqual("public, max-age=60", response.getheader("Cache-Control"))
+        for header in (etag, f'"x", W/{etag}', "*"):
+            response, body = self.get("/index.css", **{"If-None-Match": header})
+            self.assertEqual(304, response.status, header)
+            self.assertEqual(b"", body)
+        self.assertEqual(200, self.get("/index.css", **{"If-None-Match": '"abc"'})[0].status)
+
+    def test_precompressed_variant(self):
+        response, body = self.get("/", **{"Accept-Encoding": "br;q=0, gzip"})
+        self.assertEqual("gzip", response.getheader("Content-Encoding"))
+        self.assertEqual("Accept-Encoding", response.getheader("Vary"))
+        self.assertEqual(b"<p>home</p>", gzip.decompress(body))
+        self.assertTrue(response.getheader("ETag").endswith('-gz"'))
+        response, body = self.get("/")
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(b"<p>home</p>", body)
+        self.assertEqual("no-cache", response.getheader("Cache-Control"))
+
+    def test_cache_follows_file_changes(self):
+        self.assertEqual(b"body {}", self.get("/index.css")[1])
+        self.assertEqual(b"body {}", self.get("/index.css")[1])
+        self.assertEqual(1, self.site.hits)
+        etag = self.get("/index.css")[0].getheader("ETag")
+        # a build run outside the server that rewrote the same file keeps it
+        self.write("index.css", b"body {}")
+        self.save_manifest("abc123")
+        os.utime(self.manifest_path, ns=(0, 1))
+        self.assertEqual(304, self.get("/index.css", **{"If-None-Match": etag})[0].status)
+        # one that changed it gives it a new ETag
+        self.write("index.css", b"body { color: red }")
+        self.save_manifest("def456")
+        response, body = self.get("/index.css", **{"If-None-Match": etag})
+        self.assertEqual((200, b"body { color: red }"), (response.status, body))
+        self.assertEqual('"def456"', response.getheader("ETag"))
+
+    def test_large_files_are_not_cached(self):
+        with open(os.path.join(self.tmp.name, "big.bin"), "rb") as f:
+            self.assertEqual(f.read(), self.get("/big.bin")[1])
+        self.assertEqual(0, self.site.size)
+
+    def test_head_redirect_and_missing(self):
+        response, body = self.get("/index.css", "HEAD")
+        self.assertEqual(("7", b""), (response.getheader("Content-Length"), body))
+        response, _ = self.get("/docs")
+        self.assertEqual((301, "/docs/"), (response.status, response.getheader("Location")))
+        self.assertEqual(b"<p>docs</p>", self.get("/docs/")[1])
+        self.assertEqual(404, self.get("/nope.html")[0].status)
+
+    def test_accepted_encodings(self):
+        self.assertEqual({"gzip", "br"}, accepted_encodings("gzip, deflate;q=0, br;q=0.5"))
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches('W/"a", "b"', '"a"'))
+        self.assertTrue(etag_matches("*", '"a"'))
+        self.assertFalse(etag_matches('"ab"', '"a"'))
+        self.assertFalse(etag_matches(None, '"a"'))
+
+
+class TestWatch(unittest.TestCase):
+    def test_changed_paths(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "a.md")
+            with open(path, "w") as f:
+                f.write("a")
+            before = snapshot([tmp])
+            with open(path, "w") as f:
+                f.write("ab")
+            added = os.path.join(tmp, "b.md")
+            with open(added, "w") as f:
+                f.write("b")
+            self.assertEqual(sorted([path, added]), changed_paths(before, snapshot([tmp])))
+
+
+if __name__ == "__main__":
+    unittest.main()
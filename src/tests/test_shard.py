@@ -0,0 +1,173 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+from main import build, merge_build
+from manifest import load_manifest
+from shard import SHARD_MANIFEST, MergeError, parse_shard, plan_shards, shard_dir
+from tests.test_build import BuildTestCase
+
+
+class TestPlan(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual((2, 4), parse_shard("2/4"))
+        for text in ("0/4", "5/4", "2", "a/b", "1/0"):
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_every_source_gets_one_shard(self):
+        sizes = {f"content/{i}.md": i * 10 for i in range(50)}
+        plan = plan_shards(sizes, 4)
+        self.assertEqual(set(sizes), set(plan))
+        self.assertEqual({1, 2, 3, 4}, set(plan.values()))
+
+    def test_balanced_by_size(self):
+        sizes = {"big.md": 1000, "a.md": 400, "b.md": 300, "c.md": 300}
+        plan = plan_shards(sizes, 2)
+        self.assertNotEqual(plan["big.md"], plan["a.md"])
+        loads = [sum(size for s, size in sizes.items() if plan[s] == i) for i in (1, 2)]
+        self.assertEqual([1000, 1000], sorted(loads))
+
+    def test_deterministic(self):
+        sizes = {f"content/{i}.md": 100 for i in range(20)}
+        shuffled = dict(reversed(list(sizes.items())))
+        self.assertEqual(plan_shards(sizes, 3), plan_shards(shuffled, 3))
+
+
+class TestShardedBuild(BuildTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(6):
+            self.write(f"content/notes/{i}.md", f"# Note {i}\n\n" + "text " * (i * 20))
+        self.write("static/app.js", "console.log(1)")
+
+    def shard_build(self, index, count, **kwargs):
+        public_dir = shard_dir(self.path("public"), index, count)
+        return build(
+            content_dir=self.path("content"),
+            static_dir=self.path("static"),
+            template_path=self.path("template.html"),
+            public_dir=public_dir,
+            manifest_path=os.path.join(public_dir, SHARD_MANIFEST),
+            shard=(index, count),
+            **kwargs,
+        )
+
+    def merge(self, dirs, **kwargs):
+        return merge_build(
+            dirs, self.path("merged"), self.path("merged.json"), site_index=True, **kwargs
+        )
+
+    def shard_dirs(self, count):
+        return [shard_dir(self.path("public"), i, count) for i in range(1, count + 1)]
+
+    def tree(self, root):
+        ret = {}
+        for dir_path, _, file_names in os.walk(root):
+            for name in file_names:
+                path = os.path.join(dir_path, name)
+                with open(path, "rb") as f:
+                    ret[os.path.relpath(path, root)] = f.read()
+        return ret
+
+    def test_shards_split_the_site(self):
+        manifests = [self.shard_build(i, 3) for i in (1, 2, 3)]
+        pages = [set(m["pages"]) | set(m["static"]) for m in manifests]
+        self.assertEqual(10, sum(map(len, pages)))
+        self.assertEqual(10, len(set.union(*pages)))
+
+    def test_merge_matches_a_single_build(self):
+        build(
+            content_dir=self.path("content"),
+            static_dir=self.path("static"),
+            template_path=self.path("template.html"),
+            public_dir=self.path("public"),
+            manifest_path=self.path("manifest.json"),
+            site_index=True,
+        )
+        for i in (1, 2, 3):
+            self.shard_build(i, 3)
+        merged = self.merge(self.shard_dirs(3))
+
+        self.assertEqual(self.tree(self.path("public")), self.tree(self.path("merged")))
+        single = load_manifest(self.path("manifest.json"))
+        self.assertEqual(set(single["pages"]), set(merged["pages"]))
+        self.assertEqual(
+            self.path("merged/blog/post.html"),
+            merged["pages"][self.path("content/blog/post.md")]["output"],
+        )
+        self.assertEqual(merged, load_manifest(self.path("merged.json")))
+
+    def test_merge_again_places_nothing(self):
+        for i in (1, 2):
+            self.shard_build(i, 2)
+        for mode in ("copy", "auto"):
+            self.merge(self.shard_dirs(2), static_mode=mode)
+            with mock.patch("shard.place_file") as place_file:
+                self.merge(self.shard_dirs(2), static_mode=mode)
+            place_file.assert_not_called()
+
+    def test_missing_shard(self):
+        self.shard_build(1, 2)
+        with self.assertRaises(MergeError) as cm:
+            self.merge(self.shard_dirs(2))
+        self.assertIn("shard 2/2 is missing", cm.exception.problems)
+
+    def test_missing_output(self):
+        manifests = [self.shard_build(i, 2) for i in (1, 2)]
+        output = next(iter(manifests[1]["pages"].values()))["output"]
+        os.remove(output)
+        with self.assertRaises(MergeError) as cm:
+            self.merge(self.shard_dirs(2))
+        self.assertTrue(any("missing from" in p for p in cm.exception.problems))
+
+    def test_duplicate_shard(self):
+        self.shard_build(1, 2)
+        self.shard_build(2, 2)
+        with self.assertRaises(MergeError) as cm:
+            self.merge(self.shard_dirs(2) + self.shard_dirs(2)[:1])
+        self.assertTrue(any("already given" in p for p in cm.exception.problems))
+
+    def test_shards_from_different_trees(self):
+        self.shard_build(1, 2)
+        self.write("content/late.md", "# Late")
+        self.shard_build(2, 2)
+        with self.assertRaises(MergeError) as cm:
+            self.merge(self.shard_dirs(2))
+        problems = cm.exception.problems
+        self.assertTrue(
+            any("different tree" in p or "assigned to shards" in p for p in problems), problems
+        )
+
+    def test_shards_with_different_flags(self):
+        self.shard_build(1, 2, minify=True)
+        self.shard_build(2, 2)
+        with self.assertRaises(MergeError) as cm:
+            self.merge(self.shard_dirs(2))
+        self.assertTrue(any("built with minify False" in p for p in cm.exception.problems))
+
+    def test_shards_with_different_templates(self):
+        self.shard_build(1, 2)
+        self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        self.shard_build(2, 2)
+        with self.assertRaises(MergeError) as cm:
+            self.merge(self.shard_dirs(2))
+        self.assertTrue(any("built with template" in p for p in cm.exception.problems))
+
+    def test_unassigned_output(self):
+        manifests = [self.shard_build(i, 2) for i in (1, 2)]
+        path = os.path.join(self.shard_dirs(2)[0], SHARD_MANIFEST)
+        manifest = manifests[0]
+        source, entry = next(iter(manifests[1]["pages"].items()))
+        rel = os.path.relpath(entry["output"], self.shard_dirs(2)[1])
+        manifest["pages"][source] = dict(entry, output=os.path.join(self.shard_dirs(2)[0], rel))
+        with open(path, "w") as f:
+            json.dump(manifest, f)
+        with self.assertRaises(MergeError) as cm:
+            self.merge(self.shard_dirs(2))
+        self.assertTrue(any("wasn't assigned" in p for p in cm.exception.problems))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import unittest
+
+from siteindex import dangling_links, page_url, resolve_link
+from tests.test_build import BuildTestCase
+from textnode import PageIndex, markdown_to_html_node
+
+import main
+
+
+class TestSiteIndexHelpers(unittest.TestCase):
+    def test_page_url(self):
+        self.assertEqual("/", page_url("public/index.html", "public"))
+        self.assertEqual("/blog/", page_url("public/blog/index.html", "public"))
+        self.assertEqual("/blog/post.html", page_url("public/blog/post.html", "public"))
+
+    def test_resolve_link(self):
+        self.assertEqual("/blog/other.html", resolve_link("other.html", "/blog/post.html"))
+        self.assertEqual("/about", resolve_link("../about", "/blog/"))
+        self.assertEqual("/", resolve_link("/", "/blog/post.html"))
+        self.assertIsNone(resolve_link("https://example.com/x", "/"))
+        self.assertIsNone(resolve_link("#top", "/"))
+
+    def test_dangling_links(self):
+        pages = [
+            {
+                "source": "index.md",
+                "url": "/",
+                "links": ["/blog/post.html", "/blog/post", "/blog", "/missing"],
+                "images": ["/logo.png"],
+            }
+        ]
+        outputs = ["public/index.html", "public/blog/post.html", "public/blog/index.html"]
+        self.assertEqual(
+            [
+                {"source": "index.md", "kind": "link", "target": "/missing"},
+                {"source": "index.md", "kind": "image", "target": "/logo.png"},
+            ],
+            dangling_links(pages, outputs, "public"),
+        )
+
+    def test_page_index_from_parse(self):
+        index = PageIndex()
+        markdown_to_html_node(
+            "# Title\n\nSome [link](/a) and ![pic](/b.png)\n\n```\ncode here\n```", index=index
+        )
+        data = index.to_dict()
+        self.assertEqual("Title", data["title"])
+        self.assertEqual(["/a"], data["links"])
+        self.assertEqual(["/b.png"], data["images"])
+        self.assertEqual(6, data["words"])
+
+
+class TestSiteIndexBuild(BuildTestCase):
+    def build_index(self, incremental=True):
+        return main.build(
+            content_dir=self.path("content"),
+            static_dir=self.path("static"),
+            template_path=self.path("template.html"),
+            public_dir=self.path("public"),
+            manifest_path=self.path("manifest.json"),
+            incremental=incremental,
+            site_index=True,
+            site_url="https://example.com",
+            link_report=self.path("links.json"),
+        )
+
+    def test_writes_index_files(self):
+        self.write("content/index.md", "# Home\n\n[post](blog/post.html) [gone](/nope.html)")
+        self.build_index()
+        self.assertIn("<loc>https://example.com/blog/post.html</loc>", self.read("public/sitemap.xml"))
+        search = json.loads(self.read("public/search-index.json"))
+        self.assertEqual(["Home", "Post"], [page["title"] for page in search])
+        report = json.loads(self.read("links.json"))
+        self.assertEqual(["/nope.html"], [link["target"] for link in report["dangling"]])
+
+    def test_incremental_keeps_unchanged_pages(self):
+        self.build_index()
+        self.write("content/index.md", "# Home again\n\nText")
+        self.build_index()
+        search = json.loads(self.read("public/search-index.json"))
+        self.assertEqual(["Home again", "Post"], [page["title"] for page in search])
+
+    def test_generated_files_removed_when_disabled(self):
+        self.build_index()
+        self.build()
+        self.assertFalse(os.path.exists(self.path("public/sitemap.xml")))
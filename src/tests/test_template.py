@@ -0,0 +1,52 @@
+import io
+import os
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import Template, clear_cache, load_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_slots(self):
+        template = Template("<title>{{ Title }}</title>{{Content}}{{ Title }}")
+        self.assertEqual(["Title", "Content", "Title"], template.slots())
+
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title><body>{{ Content }}</body>")
+        self.assertEqual(
+            "<title>Home</title><body><p><b>hi</b></p></body>",
+            template.render(
+                {"Title": "Home", "Content": ParentNode("p", [LeafNode("b", "hi")])}
+            ),
+        )
+
+    def test_unknown_slot_is_kept(self):
+        template = Template("{{ Title }} by {{Author}}, {{  Date}}")
+        self.assertEqual("Home by {{Author}}, {{  Date}}", template.render({"Title": "Home"}))
+        out = io.StringIO()
+        template.write(out, {"Title": "Home"})
+        self.assertEqual("Home by {{Author}}, {{  Date}}", out.getvalue())
+
+    def test_write_matches_render(self):
+        template = Template("a {{ Content }} b {{ Date }}")
+        values = {"Content": ParentNode("p", [LeafNode(None, "x")]), "Date": "today"}
+        out = io.StringIO()
+        template.write(out, values)
+        self.assertEqual(template.render(values), out.getvalue())
+
+    def test_load_template_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Content }}")
+            clear_cache()
+            first = load_template(path)
+            self.assertIs(first, load_template(path))
+            with open(path, "w") as f:
+                f.write("<main>{{ Content }}</main>")
+            self.assertEqual(["<main>", "Content", "</main>"], load_template(path).parts)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,13 @@
+import io
+import mmap
+import tempfile
+import time
 import unittest
 import pprint
+import weakref
+from unittest import mock
+
+import textnode
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
 from textnode import (
@@ -8,6 +16,8 @@ from textnode import (
     block_to_block_type,
     extract_markdown_images,
     extract_markdown_links,
+    iter_blocks,
+    iter_buffer_blocks,
     markdown_to_blocks,
     markdown_to_html_node,
     split_nodes_delimiter,
@@ -15,6 +25,7 @@ from textnode import (
     split_nodes_link,
     text_node_to_html_node,
     text_to_textnodes,
+    to_blocks,
 )
 
 
@@ -41,6 +52,13 @@ class TestTextNode(unittest.TestCase):
             ).to_html(),
         )
 
+    def test_every_text_type_renders(self):
+        for text_type in TextType:
+            html = text_node_to_html_node(TextNode("x", text_type, "/u")).to_html()
+            self.assertIsInstance(html, str)
+        with self.assertRaises(Exception):
+            text_node_to_html_node(TextNode("x", "bold"))
+
 
 class TestHTMLNode(unittest.TestCase):
     def test_repr(self):
@@ -90,6 +108,80 @@ class TestParentNode(unittest.TestCase):
         node2 = ParentNode("h1", [node1])
         self.assertEqual("<h1><p><b>Bold text</b></p></h1>", node2.to_html())
 
+    def test_write_html(self):
+        node = ParentNode(
+            "div",
+            [ParentNode("p", [LeafNode("b", "Bold text"), LeafNode(None, " tail")])],
+        )
+        out = io.StringIO()
+        node.write_html(out)
+        self.assertEqual(node.to_html(), out.getvalue())
+        self.assertEqual(
+            ["<div>", "<p>", "<b>Bold text</b>", " tail", "</p>", "</div>"],
+            list(node.iter_html()),
+        )
+
+    def test_write_html_checks_children(self):
+        with self.assertRaises(ValueError):
+            ParentNode("p", []).write_html(io.StringIO())
+
+
+class TestFragmentCache(unittest.TestCase):
+    def page(self):
+        first = ParentNode("p", [LeafNode("b", "one")])
+        second = ParentNode("p", [LeafNode(None, "two")])
+        return ParentNode("div", [first, second]), first, second
+
+    def test_to_html_is_cached(self):
+        root, first, _ = self.page()
+        html = root.to_html()
+        self.assertIs(html, root.html)
+        self.assertEqual("<p><b>one</b></p>", first.html)
+        with mock.patch.object(LeafNode, "to_html") as to_html:
+            self.assertIs(html, root.to_html())
+        to_html.assert_not_called()
+
+    def test_mutation_invalidates_ancestors_only(self):
+        root, first, second = self.page()
+        root.to_html()
+        sibling_html = second.html
+        first.children[0].value = "uno"
+        self.assertIsNone(first.html)
+        self.assertIsNone(root.html)
+        self.assertIs(sibling_html, second.html)
+        self.assertEqual("<div><p><b>uno</b></p><p>two</p></div>", root.to_html())
+
+    def test_replace_child_reuses_siblings(self):
+        root, first, second = self.page()
+        root.to_html()
+        new = ParentNode("h1", [LeafNode(None, "title")])
+        root.replace_child(0, new)
+        self.assertIs(root, new.parent)
+        self.assertIsNone(first.parent)
+        with mock.patch.object(LeafNode, "to_html", return_value="x") as to_html:
+            self.assertEqual("<div><h1>x</h1><p>two</p></div>", root.to_html())
+        self.assertEqual(1, to_html.call_count)
+
+    def test_children_setter_invalidates(self):
+        root, first, _ = self.page()
+        root.to_html()
+        root.children = [first]
+        self.assertEqual("<div><p><b>one</b></p></div>", root.to_html())
+
+    def test_in_place_change_needs_invalidate(self):
+        root, first, _ = self.page()
+        root.to_html()
+        first.children.append(LeafNode(None, "!"))
+        first.invalidate()
+        self.assertEqual("<div><p><b>one</b>!</p><p>two</p></div>", root.to_html())
+
+    def test_no_reference_cycles(self):
+        root, first, second = self.page()
+        ref = weakref.ref(root)
+        del root
+        self.assertIsNone(ref())
+        self.assertIsNone(first.parent)
+
 
 class TestSplitNodes(unittest.TestCase):
     def test_split(self):
@@ -115,6 +207,13 @@ class TestSplitNodes(unittest.TestCase):
             new_nodes,
         )
 
+    def test_split_many_spans(self):
+        text = " ".join(f"*w{i}*" for i in range(5000)) + " tail *open"
+        new_nodes = split_nodes_delimiter([TextNode(text, TextType.TEXT)], "*", TextType.BOLD)
+        self.assertEqual(10002, len(new_nodes))
+        self.assertEqual(TextNode("w4999", TextType.BOLD), new_nodes[-3])
+        self.assertEqual(TextNode("open", TextType.BOLD), new_nodes[-1])
+
 
 class TestExtractMethods(unittest.TestCase):
     def test_images(self):
@@ -205,6 +304,66 @@ class TestExtractMethods(unittest.TestCase):
     def test_code(self):
         print(text_to_textnodes("An elaborate pantheon of deities (the `Valar` and `Maiar`)"))
 
+    def test_code_spans_are_literal(self):
+        # one left-to-right scan: delimiters inside a span are its text, and
+        # empty spans produce no node
+        self.assertEqual([TextNode("a*b*c", TextType.CODE)], text_to_textnodes("`a*b*c`"))
+        self.assertEqual(
+            [TextNode("a", TextType.ITALIC), TextNode("b", TextType.ITALIC)],
+            text_to_textnodes("*a**b*"),
+        )
+        self.assertEqual(
+            [TextNode("x ", TextType.TEXT), TextNode(" y", TextType.TEXT)],
+            text_to_textnodes("x `` y"),
+        )
+
+    def test_many_emphasis_spans(self):
+        nodes = text_to_textnodes(" ".join(["*x*"] * 5000))
+        self.assertEqual(9999, len(nodes))
+        self.assertEqual(TextNode("x", TextType.ITALIC), nodes[-1])
+
+    def test_unclosed_delimiter_runs_to_end(self):
+        self.assertEqual(
+            [TextNode("a ", TextType.TEXT), TextNode("b c", TextType.BOLD)],
+            text_to_textnodes("a **b c"),
+        )
+
+    def test_adjacent_links_keep_separator(self):
+        self.assertEqual(
+            [
+                TextNode("a", TextType.LINK, "/a"),
+                TextNode(" ", TextType.TEXT),
+                TextNode("b", TextType.IMAGE, "/b.png"),
+            ],
+            text_to_textnodes("[a](/a) ![b](/b.png)"),
+        )
+
+    def test_link_needs_leading_whitespace(self):
+        self.assertEqual(
+            [TextNode("x[a](/a)", TextType.TEXT)], text_to_textnodes("x[a](/a)")
+        )
+
+
+    def test_link_stays_on_one_line(self):
+        self.assertEqual(
+            [TextNode("[a\nb](/a)", TextType.TEXT)], text_to_textnodes("[a\nb](/a)")
+        )
+
+    def test_unclosed_brackets_stay_linear(self):
+        # each failed opener used to rescan the rest of the line for a closer
+        for opener in (" [a](b", " [x", " ![x", " ![a]("):
+            text = opener * 5000
+            start = time.perf_counter()
+            nodes = text_to_textnodes(text)
+            self.assertLess(time.perf_counter() - start, 1.0, opener)
+            self.assertEqual([TextNode(text, TextType.TEXT)], nodes)
+
+    def test_unmatched_bracket_keeps_scanning(self):
+        self.assertEqual(
+            [TextNode("[a] ", TextType.TEXT), TextNode("b", TextType.CODE)],
+            text_to_textnodes("[a] `b`"),
+        )
+
 
 class MarkdownMethods(unittest.TestCase):
     def test_markdown_to_blocks(self):
@@ -243,6 +402,49 @@ This is a paragraph of text. It has some **bold** and *italic* words inside of i
             [block_to_block_type(block) for block in markdown_to_blocks(markdown)],
         )
 
+    def test_iter_blocks_matches_markdown_to_blocks(self):
+        markdown = "# a\n\n\nb\nc\n\n  \n\n* d\n \n* e\n\n\n\n\n> f\n"
+        self.assertEqual(
+            markdown_to_blocks(markdown),
+            list(iter_blocks(io.StringIO(markdown))),
+        )
+        self.assertEqual(["# a", "b\nc", "* d\n \n* e", "> f"], markdown_to_blocks(markdown))
+
+    def test_buffer_blocks_match_markdown_to_blocks(self):
+        markdown = "# a\n\n\nb\nc\n\n  \n\n* d\n \n* é\n\n\n\n\n> ☃ f\n"
+        self.assertEqual(
+            markdown_to_blocks(markdown), list(iter_buffer_blocks(markdown.encode()))
+        )
+
+    def test_buffer_blocks_normalize_line_endings(self):
+        self.assertEqual(
+            ["# T", "para", "* a"], list(iter_buffer_blocks(b"# T\r\n\r\npara\r\n\r\n* a"))
+        )
+        for raw in (b"a\r\nb\r\n\r\nc\rd\r\re\n\r\nf", b"x\r\r\ny\r\n\nz\r\n"):
+            text = io.TextIOWrapper(io.BytesIO(raw), encoding="utf-8").read()
+            self.assertEqual(markdown_to_blocks(text), list(iter_buffer_blocks(raw)))
+
+    def test_mapped_file_pages_are_released(self):
+        markdown = "\n\n".join(f"para {i} " + "x" * 100 for i in range(2000))
+        with tempfile.TemporaryFile() as f:
+            f.write(markdown.encode())
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                with mock.patch.object(textnode, "RELEASE_BYTES", 4096):
+                    self.assertEqual(markdown_to_blocks(markdown), list(to_blocks(buf)))
+
+    def test_block_to_block_type_short_lines(self):
+        self.assertEqual("paragraph", block_to_block_type("*"))
+        self.assertEqual("quote", block_to_block_type(">\n> b"))
+        self.assertEqual("code", block_to_block_type("```\nx\n```"))
+
+    def test_markdown_to_html_node_from_file(self):
+        markdown = "# Title\n\nSome *text*\n\n1. one\n2. two"
+        self.assertEqual(
+            markdown_to_html_node(markdown).to_html(),
+            markdown_to_html_node(io.StringIO(markdown)).to_html(),
+        )
+
     def thingtest_markdown_to_html_node(self):
         markdown = """# This is a heading
 
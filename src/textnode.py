@@ -1,19 +1,36 @@
-from enum import Enum
+import logging
+import mmap
+import re
 
+from grammar import (
+    IMAGE,
+    IMAGE_REF,
+    IMAGE_SPLIT,
+    INLINE,
+    INLINE_TYPES,
+    LINK,
+    LINK_REF,
+    LINK_SPLIT,
+    RENDERERS,
+    TEXT,
+    TextType,
+)
 from htmlnode import HTMLNode, LeafNode, ParentNode
-import re
 
+logger = logging.getLogger("textnode")
 
-class TextType(Enum):
-    TEXT = "text"
-    BOLD = "bold"
-    ITALIC = "italic"
-    CODE = "code"
-    LINK = "link"
-    IMAGE = "image"
+# how much of a mapped source is read before its pages are released
+RELEASE_BYTES = 4 << 20
+# sources are decoded with this whether they are read whole or mapped
+SOURCE_ENCODING = "utf-8"
+# a blank line in raw bytes: two line endings in any of the forms text mode
+# turns into "\n", without splitting a "\r\n" in two
+BLANK_LINE = re.compile(rb"(?:\r\n|\r(?!\n)|\n)(?:\r\n?|\n)")
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -22,12 +39,10 @@ class TextNode:
     def __eq__(self, text_node):
         if not isinstance(text_node, TextNode):
             return False
-        return all(
-            [
-                text_node.text == self.text,
-                text_node.text_type == self.text_type,
-                text_node.url == self.url,
-            ]
+        return (
+            text_node.text == self.text
+            and text_node.text_type is self.text_type
+            and text_node.url == self.url
         )
 
     def __repr__(self):
@@ -35,20 +50,10 @@ class TextNode:
 
 
 def text_node_to_html_node(text_node):
-    tpe = text_node.text_type
-    if tpe == TextType.TEXT:
-        return LeafNode(None, text_node.text)
-    if tpe == TextType.BOLD:
-        return LeafNode("b", text_node.text)
-    if tpe == TextType.ITALIC:
-        return LeafNode("i", text_node.text)
-    if tpe == TextType.CODE:
-        return LeafNode("code", text_node.text)
-    if tpe == TextType.LINK:
-        return LeafNode("a", text_node.text, props={"href": text_node.url})
-    if tpe == TextType.IMAGE:
-        return LeafNode("img", "", props={"src": text_node.url, "alt": text_node.text})
-    raise Exception("Unsupported node type")
+    render = RENDERERS.get(text_node.text_type)
+    if render is None:
+        raise Exception("Unsupported node type")
+    return render(text_node)
 
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
@@ -56,26 +61,26 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     for node in old_nodes:
         if not node.text and not node.url:
             continue
-        if node.text_type != TextType.TEXT or delimiter not in node.text:
+        if node.text_type is not TEXT or delimiter not in node.text:
             new_nodes.append(node)
-        else:
-            split = node.text.split(delimiter, maxsplit=2)
-            print(split)
-            print(split[0], split[1], "".join(split[2:]))
-            new_nodes.extend(
-                [TextNode(split[0], TextType.TEXT), TextNode(split[1], text_type)]
-            )
-            new_nodes.extend(
-                split_nodes_delimiter(
-                    [TextNode("".join(split[2:]), TextType.TEXT)], delimiter, text_type
-                )
-            )
+            continue
+        # text and delimited spans alternate; an unclosed delimiter runs to the
+        # end, and trailing text only counts when there is some
+        split = node.text.split(delimiter)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("split %r on %r: %r", node.text, delimiter, split)
+        last = len(split) - 1
+        for i, part in enumerate(split):
+            if i % 2:
+                new_nodes.append(TextNode(part, text_type))
+            elif part or i < last:
+                new_nodes.append(TextNode(part, TEXT))
 
     return new_nodes
 
 
 def extract_markdown_images(text):
-    matches = re.findall(r"\s!\[.*?\]\(.*?\)", text)
+    matches = IMAGE_REF.findall(text)
     ret = []
 
     for m in matches:
@@ -85,7 +90,7 @@ def extract_markdown_images(text):
 
 
 def extract_markdown_links(text):
-    matches = re.findall(r"\s\[.*?\]\(.*?\)", text)
+    matches = LINK_REF.findall(text)
     ret = []
 
     for m in matches:
@@ -98,10 +103,10 @@ def split_nodes_image(old_nodes):
     new_nodes = []
 
     for node in old_nodes:
-        if node.text_type != TextType.TEXT:
+        if node.text_type is not TEXT:
             new_nodes.append(node)
             continue
-        matches = re.findall(r"(?:^|\s)!\[[^\]]*?\]\([^\)]*?\)", node.text)
+        matches = IMAGE_SPLIT.findall(node.text)
         text = node.text
         for m in matches:
             if not m:
@@ -113,16 +118,16 @@ def split_nodes_image(old_nodes):
             t = t.lstrip(" ![")
             url = url.rstrip(")")
             if not left_text:
-                new_nodes.append(TextNode(t, TextType.IMAGE, url=url))
+                new_nodes.append(TextNode(t, IMAGE, url=url))
             else:
                 new_nodes.extend(
                     [
-                        TextNode(left_text + " ", TextType.TEXT),
-                        TextNode(t, TextType.IMAGE, url=url),
+                        TextNode(left_text + " ", TEXT),
+                        TextNode(t, IMAGE, url=url),
                     ]
                 )
         if text:
-            new_nodes.append(TextNode(text, TextType.TEXT))
+            new_nodes.append(TextNode(text, TEXT))
 
     return new_nodes
 
@@ -131,10 +136,10 @@ def split_nodes_link(old_nodes):
     new_nodes = []
 
     for node in old_nodes:
-        if node.text_type != TextType.TEXT:
+        if node.text_type is not TEXT:
             new_nodes.append(node)
             continue
-        matches = re.findall(r"(?:^|\s)\[.*?\]\(.*?\)", node.text)
+        matches = LINK_SPLIT.findall(node.text)
         text = node.text
         for m in matches:
             if not text:
@@ -144,155 +149,315 @@ def split_nodes_link(old_nodes):
             t = t.lstrip(" [")
             url = url.rstrip(")")
             if not left_text:
-                new_nodes.append(TextNode(t, TextType.LINK, url=url))
+                new_nodes.append(TextNode(t, LINK, url=url))
             else:
                 new_nodes.extend(
                     [
-                        TextNode(left_text + " ", TextType.TEXT),
-                        TextNode(t, TextType.LINK, url=url),
+                        TextNode(left_text + " ", TEXT),
+                        TextNode(t, LINK, url=url),
                     ]
                 )
         if text:
-            new_nodes.append(TextNode(text, TextType.TEXT))
+            new_nodes.append(TextNode(text, TEXT))
 
     return new_nodes
 
 
 def text_to_textnodes(text):
-    nodes = [TextNode(text=text, text_type=TextType.TEXT)]
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    # one left-to-right scan with the combined INLINE pattern. Delimited spans
+    # come back whole; image and link openers are closed here with str.find,
+    # remembering the last hit per needle so repeated openers don't rescan.
+    nodes = []
+    found = {}
+
+    def find(needle, pos):
+        cached = found.get(needle)
+        if cached is None or -1 < cached < pos:
+            cached = text.find(needle, pos)
+            found[needle] = cached
+        return cached
+
+    start = 0
+    pos = 0
+    search = INLINE.search
+    while True:
+        m = search(text, pos)
+        if m is None:
+            break
+        i = m.start()
+        kind = m.lastgroup
+        if kind == "bracket":
+            label = m.end()
+            if label - i == 2:
+                close = find("]", label)
+                if close == -1 or not text.startswith("(", close + 1):
+                    pos = i + 1
+                    continue
+                end = find(")", close + 2)
+                if end == -1:
+                    pos = i + 1
+                    continue
+                node = TextNode(text[label:close].lstrip(" !["), IMAGE, text[close + 2 : end])
+            else:
+                line_end = find("\n", label)
+                if line_end == -1:
+                    line_end = len(text)
+                close = find("](", label)
+                end = find(")", close + 2) if -1 < close < line_end else -1
+                if end == -1 or end > line_end:
+                    pos = i + 1
+                    continue
+                node = TextNode(text[label:close].lstrip(" ["), LINK, text[close + 2 : end])
+            pos = end + 1
+        else:
+            node = TextNode(m[kind], INLINE_TYPES[kind]) if m[kind] else None
+            pos = m.end()
+        if i > start:
+            nodes.append(TextNode(text[start:i], TEXT))
+        if node is not None:
+            nodes.append(node)
+        start = pos
+    if start < len(text):
+        nodes.append(TextNode(text[start:], TEXT))
     return nodes
 
 
 def markdown_to_blocks(markdown):
     ret = []
     for line in markdown.split("\n\n"):
+        line = line.strip()
         if line == "":
             continue
-        line = line.strip()
         ret.append(line)
     return ret
 
 
+def iter_blocks(lines):
+    # same blocks as markdown_to_blocks, but from any iterable of lines (e.g. an
+    # open file) while holding only the current block in memory
+    block = []
+    for line in lines:
+        if line.endswith("\n"):
+            line = line[:-1]
+        if line:
+            block.append(line)
+            continue
+        if block:
+            text = "\n".join(block).strip()
+            block = []
+            if text:
+                yield text
+    if block:
+        text = "\n".join(block).strip()
+        if text:
+            yield text
+
+
+def iter_buffer_blocks(buf):
+    # same blocks as markdown_to_blocks from a bytes-like buffer such as an
+    # mmap: boundaries are found on the raw bytes and only the current block is
+    # decoded, with line endings normalized as a file read in text mode would
+    # be. Pages already consumed are handed back to the kernel so a mapped
+    # file doesn't stay resident as it is read.
+    release = getattr(buf, "madvise", None) if hasattr(mmap, "MADV_DONTNEED") else None
+    released = 0
+    start = 0
+    end = len(buf)
+    search = BLANK_LINE.search
+    while start < end:
+        m = search(buf, start)
+        i, after = m.span() if m else (end, end)
+        text = buf[start:i].decode(SOURCE_ENCODING)
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        text = text.strip()
+        if text:
+            yield text
+        start = after
+        if release is not None and start - released >= RELEASE_BYTES:
+            upto = min(start, end) // mmap.PAGESIZE * mmap.PAGESIZE
+            release(mmap.MADV_DONTNEED, released, upto - released)
+            released = upto
+
+
 def block_to_block_type(markdown):
     if not markdown:
         return "paragraph"
 
-    l = len(markdown)
-
-    if re.findall(r"^[#+]{1,6}", markdown):
+    if markdown[0] in "#+":
         return "heading"
-    if l > 5 and markdown[:3] == "```" and markdown[:3] == markdown[-3:]:
+    if len(markdown) > 5 and markdown[:3] == "```" and markdown[-3:] == "```":
         return "code"
-    if all([x[0] == ">" for x in markdown.split("\n")]):
+
+    # one pass over the lines, dropping candidates as soon as a line rules them out
+    quote = unordered = ordered = True
+    for i, x in enumerate(markdown.split("\n")):
+        if quote and x[:1] != ">":
+            quote = False
+        if unordered and (x[:1] not in ("*", "-") or x[1:2] != " "):
+            unordered = False
+        if ordered and x[:3] != f"{i+1}. ":
+            ordered = False
+        if not (quote or unordered or ordered):
+            return "paragraph"
+    if quote:
         return "quote"
-    if all([x[0] in "*-" and x[1] == " " for x in markdown.split("\n")]):
+    if unordered:
         return "unordered_list"
-    is_para = False
-    for i, x in enumerate(markdown.split("\n")):
-        if len(x) < 3:
-            is_para = True
-            break
-        if x[:3] == f"{i+1}. ":
-            continue
-        is_para = True
-        break
-    return "paragraph" if is_para else "ordered_list"
+    return "ordered_list"
+
+
+def to_blocks(markdown):
+    # markdown is a string, a bytes-like buffer (e.g. an mmap) or a file object /
+    # iterable of lines
+    if isinstance(markdown, str):
+        return markdown_to_blocks(markdown)
+    if isinstance(markdown, (bytes, bytearray, mmap.mmap)):
+        return iter_buffer_blocks(markdown)
+    return iter_blocks(markdown)
+
 
 def extract_header(markdown):
-    for block in markdown_to_blocks(markdown):
+    for block in to_blocks(markdown):
         if block.startswith("# "):
             return block.lstrip("# ").rstrip(" ")
     raise ValueError("need a header")
 
 
-def markdown_to_html_node(markdown):
-    children = []
-    for block in markdown_to_blocks(markdown):
-        tpe = block_to_block_type(block)
-        if tpe == "paragraph":
-            children.append(
-                ParentNode(
-                    tag="p",
-                    children=[
-                        text_node_to_html_node(node)
-                        for node in text_to_textnodes(block)
-                    ],
-                )
-            )
-        elif tpe == "heading":
-            cnt = 0
-            for x in block:
-                if x != "#":
-                    break
-                cnt += 1
-            block = block.lstrip("# ")
-            children.append(
-                ParentNode(
-                    tag=f"h{cnt}",
-                    children=[
-                        text_node_to_html_node(node)
-                        for node in text_to_textnodes(block)
-                    ],
-                )
-            )
-        elif tpe == "code":
-            b = block.rstrip("```").lstrip("```\n")
-            children.append(
-                ParentNode(
-                    tag="pre",
-                    children=[
-                        LeafNode(
-                            tag="code",
-                            value=b
-                        )
-                    ],
-                )
-            )
-        elif tpe == "unordered_list":
-            sub_children = []
-            for l in block.split("\n"):
-                l = l[1:].lstrip(" ")
-                sub_children.append(
-                    ParentNode(
-                        tag="li",
-                        children=[
-                            text_node_to_html_node(node)
-                            for node in text_to_textnodes(l)
-                        ],
-                    )
-                )
-            children.append(ParentNode(tag="ul", children=sub_children))
-        elif tpe == "ordered_list":
-            sub_children = []
-            for l in block.split("\n"):
-                _, l = l.split(".", maxsplit=1)
-                l =l.lstrip(" ")
-                sub_children.append(
-                    ParentNode(
-                        tag="li",
-                        children=[
-                            text_node_to_html_node(node)
-                            for node in text_to_textnodes(l)
-                        ],
-                    )
-                )
-            children.append(ParentNode(tag="ol", children=sub_children))
-        elif tpe == "quote":
-            sub_children = []
-            for l in block.split("\n"):
-                sub_children.extend(
-                    [text_node_to_html_node(node) for node in text_to_textnodes(l.lstrip("> "))]
-                )
-            children.append(
-                ParentNode(
-                    tag="blockquote",
-                    children=sub_children,
+SEARCH_TEXT_LIMIT = 1000
+
+
+class PageIndex:
+    # what the site index needs from a page, collected while it is parsed
+    __slots__ = ("title", "links", "images", "words", "text", "text_size")
+
+    def __init__(self):
+        self.title = None
+        self.links = []
+        self.images = []
+        self.words = 0
+        self.text = []
+        self.text_size = 0
+
+    def __repr__(self):
+        return f"PageIndex({self.title}, {len(self.links)} links, {len(self.images)} images, {self.words} words)"
+
+    def add_text(self, text):
+        self.words += len(text.split())
+        self.keep_text(text)
+
+    def keep_text(self, text):
+        if self.text_size < SEARCH_TEXT_LIMIT:
+            text = text[: SEARCH_TEXT_LIMIT - self.text_size]
+            self.text.append(text)
+            self.text_size += len(text)
+
+    def add_nodes(self, nodes):
+        for node in nodes:
+            if node.text_type is IMAGE:
+                self.images.append(node.url)
+                continue
+            if node.text_type is LINK:
+                self.links.append(node.url)
+            self.add_text(node.text)
+        self.add_text(" ")
+
+    def merge(self, data):
+        if self.title is None:
+            self.title = data["title"]
+        self.links.extend(data["links"])
+        self.images.extend(data["images"])
+        self.words += data["words"]
+        self.keep_text(data["text"] + " ")
+
+    def to_dict(self):
+        return {
+            "title": self.title,
+            "links": self.links,
+            "images": self.images,
+            "words": self.words,
+            "text": " ".join("".join(self.text).split()),
+        }
+
+
+def inline_children(text, index=None):
+    nodes = text_to_textnodes(text)
+    if index is not None:
+        index.add_nodes(nodes)
+    return [text_node_to_html_node(node) for node in nodes]
+
+
+def block_to_html_node(block, index=None):
+    tpe = block_to_block_type(block)
+    if tpe == "paragraph":
+        return ParentNode(tag="p", children=inline_children(block, index))
+    elif tpe == "heading":
+        cnt = 0
+        for x in block:
+            if x != "#":
+                break
+            cnt += 1
+        if index is not None and index.title is None and block.startswith("# "):
+            index.title = block.lstrip("# ").rstrip(" ")
+        block = block.lstrip("# ")
+        return ParentNode(tag=f"h{cnt}", children=inline_children(block, index))
+    elif tpe == "code":
+        b = block.rstrip("```").lstrip("```\n")
+        if index is not None:
+            index.add_text(b)
+        return ParentNode(
+            tag="pre",
+            children=[
+                LeafNode(
+                    tag="code",
+                    value=b
                 )
-            )
+            ],
+        )
+    elif tpe == "unordered_list":
+        sub_children = []
+        for l in block.split("\n"):
+            l = l[1:].lstrip(" ")
+            sub_children.append(ParentNode(tag="li", children=inline_children(l, index)))
+        return ParentNode(tag="ul", children=sub_children)
+    elif tpe == "ordered_list":
+        sub_children = []
+        for l in block.split("\n"):
+            _, l = l.split(".", maxsplit=1)
+            l =l.lstrip(" ")
+            sub_children.append(ParentNode(tag="li", children=inline_children(l, index)))
+        return ParentNode(tag="ol", children=sub_children)
+    elif tpe == "quote":
+        sub_children = []
+        for l in block.split("\n"):
+            sub_children.extend(inline_children(l.lstrip("> "), index))
+        return ParentNode(
+            tag="blockquote",
+            children=sub_children,
+        )
+    raise ValueError(f"unknown block type {tpe}")
 
-    return ParentNode(tag="div", children=children)
+
+def iter_block_nodes(markdown, cache=None, index=None):
+    for block in to_blocks(markdown):
+        if cache is None:
+            yield block_to_html_node(block, index)
+            continue
+        # cached blocks come back as pre-rendered raw HTML leaves, along with
+        # the index data collected when they were first rendered
+        cached = cache.get(block)
+        if cached is None:
+            block_index = PageIndex()
+            html = block_to_html_node(block, block_index).to_html()
+            cached = (html, block_index.to_dict())
+            cache.put(block, cached)
+        html, data = cached
+        if index is not None and data is not None:
+            index.merge(data)
+        yield LeafNode(None, html)
+
+
+def markdown_to_html_node(markdown, cache=None, index=None):
+    return ParentNode(
+        tag="div", children=list(iter_block_nodes(markdown, cache, index))
+    )
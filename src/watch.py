@@ -0,0 +1,36 @@
+import os
+import time
+
+
+def snapshot(paths):
+    ret = {}
+    for path in paths:
+        if os.path.isfile(path):
+            st = os.stat(path)
+            ret[path] = (st.st_mtime_ns, st.st_size)
+            continue
+        for root, _, files in os.walk(path):
+            for file in files:
+                file_path = os.path.join(root, file)
+                try:
+                    st = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                ret[file_path] = (st.st_mtime_ns, st.st_size)
+    return ret
+
+
+def changed_paths(old, new):
+    return sorted(path for path in old.keys() | new.keys() if old.get(path) != new.get(path))
+
+
+def watch(paths, callback, interval=0.5, stop=None):
+    # polls instead of using inotify & co so it works the same everywhere
+    current = snapshot(paths)
+    while stop is None or not stop.is_set():
+        time.sleep(interval)
+        new = snapshot(paths)
+        changed = changed_paths(current, new)
+        if changed:
+            current = new
+            callback(changed)
@@ -0,0 +1 @@
+python3 src/scaling.py "$@"
\ No newline at end of file